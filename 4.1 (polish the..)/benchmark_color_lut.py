@@ -0,0 +1,36 @@
+import time
+import cv2
+import numpy as np
+from whiffle_letitshine import BallDetector
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080), (3840, 2160)]
+RUNS = 30
+
+def make_test_frame(width, height):
+    # Playfield-ish background with a few white and red balls
+    rng = np.random.default_rng(0)
+    frame = rng.integers(40, 160, (height, width, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (15, 15), 0)
+    radius = max(6, height // 80)
+    for i in range(8):
+        center = (int(rng.integers(radius, width - radius)), int(rng.integers(radius, height - radius)))
+        color = (0, 0, 230) if i == 0 else (245, 245, 245)
+        cv2.circle(frame, center, radius, color, -1)
+    return frame
+
+def time_masks(detector, frame):
+    detector.masks(frame)  # Warm up buffers
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        mask_white, mask_red = detector.masks(frame)
+    return (time.perf_counter() - start) / RUNS * 1000, mask_white.copy(), mask_red.copy()
+
+print(f"Color mask benchmark ({RUNS} runs each)")
+for width, height in RESOLUTIONS:
+    frame = make_test_frame(width, height)
+    hsv_ms, hsv_white, hsv_red = time_masks(BallDetector("hsv"), frame)
+    lut_ms, lut_white, lut_red = time_masks(BallDetector("lut"), frame)
+    white_agree = np.mean(hsv_white == lut_white) * 100
+    red_agree = np.mean(hsv_red == lut_red) * 100
+    print(f"{width}x{height}: cvtColor+inRange {hsv_ms:.2f}ms, LUT {lut_ms:.2f}ms "
+          f"({hsv_ms / lut_ms:.2f}x), mask agreement white {white_agree:.2f}% red {red_agree:.2f}%")
@@ -0,0 +1,66 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 3
+PHASES = ["import", "splash", "startup ready", "first frame"]
+
+def run_child():
+    # One cold start: import, splash, background startup and the first rendered frame, in seconds from launch
+    start = time.perf_counter()
+    import whiffle_letitshine as game
+    timings = {"import": time.perf_counter() - start}
+    game.SPLASH_MIN_DURATION = 0
+    game.load_gui_modules()
+
+    def start_game(startup):
+        timings["startup ready"] = time.perf_counter() - start
+        root = game.tk.Tk()
+        app = game.WhiffleGame(root, startup)
+
+        def wait_for_frame():
+            if app.first_frame_time is not None:
+                timings["first frame"] = app.first_frame_time - start
+                print(json.dumps(timings))
+                app.destroy()
+                return
+            try:
+                root.after(10, wait_for_frame)
+            except game.tk.TclError:
+                print(json.dumps(timings))  # Game closed before a frame, e.g. no webcam
+
+        wait_for_frame()
+        root.mainloop()
+
+    splash_root = game.tk.Tk()
+    splash = game.SplashScreen(splash_root, start_game)
+    splash_root.update()
+    timings["splash"] = time.perf_counter() - start
+    splash.start(game.StartupLoader())
+    splash_root.mainloop()
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        run_child()
+        sys.exit()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    print(f"Startup benchmark ({RUNS} cold starts)")
+    for run in range(RUNS):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=here,
+                                capture_output=True, text=True).stdout
+        lines = [line for line in output.splitlines() if line.startswith("{")]
+        if not lines:
+            print(f"Run {run + 1}: no timings reported")
+            continue
+        timings = json.loads(lines[-1])
+        results.append(timings)
+        print(f"Run {run + 1}: " + ", ".join(f"{phase} {timings[phase]:.2f}s" for phase in PHASES if phase in timings))
+    for phase in PHASES:
+        values = [timings[phase] for timings in results if phase in timings]
+        if values:
+            print(f"Median {phase}: {statistics.median(values):.2f}s")
@@ -0,0 +1,51 @@
+import argparse
+import time
+import numpy as np
+from whiffle_letitshine import SCORE_EVENTS_FILE, load_score_events, default_score_rules, replay_scores, recorded_scores
+
+def parse_zone_points(text):
+    # "200=250,1=5" -> {200: 250, 1: 5}
+    pairs = [item.split("=") for item in text.split(",") if item]
+    return {int(old): int(new) for old, new in pairs}
+
+parser = argparse.ArgumentParser(description="Re-score recorded games under a different rule set.")
+parser.add_argument("--events", default=SCORE_EVENTS_FILE, help="Score event log")
+parser.add_argument("--zone-points", type=parse_zone_points, default={}, help="Hole values to change, e.g. 200=250,1=5")
+parser.add_argument("--red-multiplier", type=int)
+parser.add_argument("--red-cooldown", type=float)
+parser.add_argument("--power-up-multiplier", type=int)
+parser.add_argument("--special-multiplier", type=int)
+parser.add_argument("--repeat", type=int, default=1, help="Replay the log this many times over, to time large archives")
+args = parser.parse_args()
+
+events = load_score_events(args.events)
+if args.repeat > 1:
+    # Renumber the copies so each one is a separate game
+    copies = np.tile(events, args.repeat)
+    span = int(events["game"].max()) + 1 if len(events) else 0
+    copies["game"] += np.repeat(np.arange(args.repeat, dtype=np.uint32) * span, len(events))
+    events = copies
+rules = default_score_rules()
+rules["zone_points"] = args.zone_points
+for name in ["red_multiplier", "red_cooldown", "power_up_multiplier", "special_multiplier"]:
+    if getattr(args, name) is not None:
+        rules[name] = getattr(args, name)
+
+start = time.perf_counter()
+baseline_games, baseline = replay_scores(events)
+games, scores = replay_scores(events, rules)
+elapsed = time.perf_counter() - start
+recorded_games, recorded = recorded_scores(events)
+finished = np.isin(games, recorded_games)
+
+print(f"{len(games)} games, {len(events)} events replayed twice in {elapsed * 1000:.1f}ms")
+print(f"Rules: {rules}")
+if finished.any():
+    matches = np.mean(baseline[finished] == recorded[np.searchsorted(recorded_games, games[finished])]) * 100
+    print(f"Current rules reproduce {matches:.1f}% of recorded final scores")
+if len(games):
+    print(f"Mean score {baseline.mean():.1f} -> {scores.mean():.1f}, best {baseline.max()} -> {scores.max()}")
+    changed = np.flatnonzero(baseline != scores)
+    print(f"{len(changed)} games change score")
+    for index in changed[:10]:
+        print(f"  Game {games[index]}: {baseline[index]} -> {scores[index]}")
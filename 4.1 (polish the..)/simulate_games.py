@@ -0,0 +1,188 @@
+import argparse
+import os
+import re
+import time
+import numpy as np
+from whiffle_letitshine import (SCORE_EVENTS_FILE, SCORE_EVENT_DTYPE, EVENT_ZONE, EVENT_SPECIAL, EVENT_POWER_UP_ZONE,
+                                EVENT_FLAG_RED, EVENT_FLAG_MULTIPLIED, POWER_UP_TYPES, POWER_UP_DURATION,
+                                POWER_UP_SPAWN_INTERVAL, POWER_UP_MULTIPLIER, RED_BALL_COOLDOWN,
+                                load_point_zones, load_score_events, default_score_rules, replay_scores)
+
+SCORING_LOG_FILE = os.path.join("..", "scoring_log.txt")
+DEFAULT_THROW_INTERVAL = 4.0  # Mean seconds between balls when the source has no timings (scoring_log.txt)
+# Seconds each power-up blocks a new one. Score Multiplier lasts until it is used and Double Balls has no
+# duration, as in PowerUp; Extra Time only exists in timed mode, and simulated games are classic games
+POWER_UP_BLOCK = {"Score Multiplier": np.inf, "Slow Motion": POWER_UP_DURATION, "Extra Time": 0.0, "Double Balls": np.inf}
+SWEEPS = {
+    "power_up_spawn_interval": [5, 10, POWER_UP_SPAWN_INTERVAL, 30, 60],
+    "power_up_multiplier": [1, 2, POWER_UP_MULTIPLIER, 5],
+    "red_cooldown": [0.0, 1.0, RED_BALL_COOLDOWN, 5.0, 10.0],
+    "special_multiplier": [1, 2, 3],
+}
+SCORE_LINE = re.compile(r"Scored ball at .*\(hole at .*points: (\d+), red: (True|False)\)")
+SUMMARY_LINE = re.compile(r"Base Score: .*Special Hole Hit: (True|False)")
+
+def landings_from_events(events):
+    # Hole values, red flags, special hits, balls per game and seconds between balls from a score event log
+    zone = events[events["kind"] == EVENT_ZONE]
+    thrown = events[np.isin(events["kind"], [EVENT_ZONE, EVENT_SPECIAL, EVENT_POWER_UP_ZONE])]
+    _, throws = np.unique(thrown["game"], return_counts=True)
+    same_game = np.diff(thrown["game"]) == 0
+    gaps = np.diff(thrown["time"].astype(np.float64))[same_game]
+    return (zone["points"], (zone["flags"] & EVENT_FLAG_RED) > 0, int(np.sum(events["kind"] == EVENT_SPECIAL)),
+            throws, gaps[gaps >= 0])
+
+def landings_from_scoring_log(filename):
+    # Same as landings_from_events for the text log of the earlier scorer, which has no timings
+    values, red, throws = [], [], []
+    specials, balls = 0, 0
+    with open(filename) as f:
+        for line in f:
+            match = SCORE_LINE.match(line)
+            if match:
+                values.append(int(match.group(1)))
+                red.append(match.group(2) == "True")
+                balls += 1
+                continue
+            match = SUMMARY_LINE.match(line)
+            if match:
+                specials += match.group(1) == "True"
+                throws.append(balls)
+                balls = 0
+    return np.array(values), np.array(red, dtype=bool), specials, np.array(throws), np.array([])
+
+def learn_model(point_zones, values, red, specials, throws, gaps):
+    # Landing probability of every hole in the current layout. Hole values stand in for holes, so a value shared
+    # by several holes is split evenly between them; values missing from the layout are dropped
+    zone_values = np.array([points for _, _, _, points in point_zones])
+    unique, counts = np.unique(values, return_counts=True)
+    per_value = dict(zip(unique.tolist(), counts.tolist()))
+    holes_with_value = {value: np.sum(zone_values == value) for value in zone_values.tolist()}
+    weights = np.array([per_value.get(value, 0) / holes_with_value[value] for value in zone_values.tolist()] + [specials],
+                       dtype=np.float64)
+    dropped = len(values) - int(sum(count for value, count in per_value.items() if value in holes_with_value))
+    if dropped:
+        print(f"{dropped} landings on hole values not in the current layout were ignored")
+    if weights.sum() == 0:
+        raise SystemExit("No landings in the current layout to learn from.")
+    throws = throws[throws > 0]
+    return {
+        "zone_values": zone_values,
+        "landing": weights / weights.sum(),  # Last entry is the special hole
+        "red": float(np.mean(red)) if len(red) else 0.0,
+        "throws": throws if len(throws) else np.array([10]),
+        "gaps": gaps if len(gaps) else None,
+    }
+
+def simulate_events(model, games, spawn_interval, rng, first_game=0):
+    # Plays a batch of classic games as score events. Every game advances one ball per step, all games in step,
+    # with the power-up zone cycle of WhiffleGame: a zone appears when none is active and spawn_interval has passed
+    # since the last one, lives POWER_UP_DURATION, and a ball in it starts a random power-up instead of scoring
+    holes = len(model["zone_values"])
+    counts = rng.choice(model["throws"], games)
+    steps = int(counts.max())
+    if model["gaps"] is None:
+        gaps = rng.exponential(DEFAULT_THROW_INTERVAL, (games, steps))
+    else:
+        gaps = rng.choice(model["gaps"], (games, steps))
+    times = np.cumsum(gaps, axis=1)
+    landing = rng.choice(holes + 1, (games, steps), p=model["landing"])
+    red = rng.random((games, steps)) < model["red"]
+    live = np.arange(steps)[None, :] < counts[:, None]
+
+    period = max(spawn_interval, POWER_UP_DURATION)
+    block = np.array([POWER_UP_BLOCK[name] for name in POWER_UP_TYPES])
+    multiplier_type = POWER_UP_TYPES.index("Score Multiplier")
+    spawn = np.zeros(games)
+    zone_hole = rng.integers(holes, size=games)
+    power = np.full(games, -1)
+    power_end = np.zeros(games)
+    scored = np.zeros((games, steps), dtype=bool)
+    multiplied = np.zeros((games, steps), dtype=bool)
+    for step in range(steps):
+        t = times[:, step]
+        # Unused zones expire and respawn every period until the ball arrives
+        respawned = t >= spawn + period
+        spawn = np.where(respawned, spawn + np.floor((t - spawn) / period) * period, spawn)
+        zone_hole = np.where(respawned, rng.integers(holes, size=games), zone_hole)
+        zone_hit = live[:, step] & (spawn <= t) & (t < spawn + POWER_UP_DURATION) & (landing[:, step] == zone_hole)
+        power_active = (power >= 0) & (t < power_end)
+        new_power = rng.integers(len(POWER_UP_TYPES), size=games)
+        started = zone_hit & ~power_active
+        power = np.where(started, new_power, np.where(power_active, power, -1))
+        power_end = np.where(started, t + block[new_power], power_end)
+        spawn = np.where(zone_hit, np.maximum(spawn + spawn_interval, t), spawn)
+        zone_hole = np.where(zone_hit, rng.integers(holes, size=games), zone_hole)
+
+        scored[:, step] = live[:, step] & ~zone_hit
+        in_zone = scored[:, step] & (landing[:, step] < holes)
+        multiplied[:, step] = in_zone & (power == multiplier_type) & (t < power_end)
+        power = np.where(multiplied[:, step], -1, power)
+
+    game, step = np.nonzero(scored)
+    hole = landing[game, step]
+    special = hole == holes
+    events = np.zeros(len(game), dtype=SCORE_EVENT_DTYPE)
+    events["game"] = first_game + game
+    events["time"] = times[game, step]
+    events["kind"] = np.where(special, EVENT_SPECIAL, EVENT_ZONE)
+    events["zone"] = np.where(special, -1, hole)
+    events["points"] = np.where(special, 0, model["zone_values"][np.minimum(hole, holes - 1)])
+    events["flags"] = (np.where(red[game, step] & ~special, EVENT_FLAG_RED, 0)
+                       | np.where(multiplied[game, step], EVENT_FLAG_MULTIPLIED, 0))
+    return events
+
+def summarize(scores):
+    return (f"mean {scores.mean():8.1f}  median {np.median(scores):7.0f}  p95 {np.percentile(scores, 95):7.0f}  "
+            f"p99 {np.percentile(scores, 99):7.0f}  max {scores.max():7d}")
+
+parser = argparse.ArgumentParser(description="Monte Carlo simulation of Whiffle scoring rules.")
+parser.add_argument("--events", default=SCORE_EVENTS_FILE, help="Score event log to learn landings from")
+parser.add_argument("--scoring-log", default=SCORING_LOG_FILE, help="Text log used when there is no event log")
+parser.add_argument("--games", type=int, default=1_000_000)
+parser.add_argument("--batch", type=int, default=200_000, help="Games simulated at once")
+parser.add_argument("--seed", type=int, default=0)
+args = parser.parse_args()
+
+point_zones, _ = load_point_zones()
+if not point_zones:
+    raise SystemExit("No zones in the calibration file.")
+if os.path.exists(args.events):
+    source = args.events
+    landings = landings_from_events(load_score_events(args.events))
+else:
+    source = args.scoring_log
+    landings = landings_from_scoring_log(args.scoring_log)
+model = learn_model(point_zones, *landings)
+print(f"Learned from {source}: {len(landings[0])} scored balls, {len(landings[3])} games, "
+      f"special {model['landing'][-1] * 100:.1f}%, red {model['red'] * 100:.1f}%, "
+      f"{'recorded' if model['gaps'] is not None else f'{DEFAULT_THROW_INTERVAL:.0f}s mean'} gaps between balls")
+
+# Every rule value replays the same simulated games (common random numbers), so differences come from the rule
+baseline_rules = default_score_rules()
+configs = [(name, value) for name, values in SWEEPS.items() for value in values]
+results = {config: [] for config in configs}
+start = time.perf_counter()
+for first_game in range(0, args.games, args.batch):
+    games = min(args.batch, args.games - first_game)
+    batch_seed = args.seed * 1_000_003 + first_game
+    baseline_events = simulate_events(model, games, POWER_UP_SPAWN_INTERVAL, np.random.default_rng(batch_seed), first_game)
+    for name, value in configs:
+        if name == "power_up_spawn_interval":
+            events = simulate_events(model, games, value, np.random.default_rng(batch_seed), first_game)
+            rules = baseline_rules
+        else:
+            events = baseline_events
+            rules = {**baseline_rules, name: value}
+        played, scores = replay_scores(events, rules)
+        # Games where every ball went into a power-up zone have no scoring events
+        results[(name, value)].append(np.concatenate([scores, np.zeros(games - len(played), dtype=np.int64)]))
+elapsed = time.perf_counter() - start
+print(f"{args.games} games x {len(configs)} rule settings in {elapsed:.1f}s")
+
+current = {"power_up_spawn_interval": POWER_UP_SPAWN_INTERVAL, **baseline_rules}
+for name, values in SWEEPS.items():
+    print(f"\n{name}")
+    for value in values:
+        marker = "*" if value == current[name] else " "
+        print(f" {marker} {value:>6}: {summarize(np.concatenate(results[(name, value)]))}")
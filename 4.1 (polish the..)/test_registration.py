@@ -0,0 +1,82 @@
+import os
+import tempfile
+import cv2
+import numpy as np
+import whiffle_letitshine as game
+
+FRAME_SIZE = (1280, 720)
+BUMP = (15, 8)  # Camera shift in pixels, above REGISTRATION_DRIFT_THRESHOLD and below REGISTRATION_MAX_DRIFT
+POINT_ZONES = [(300, 200, game.ZONE_RADIUS, 50), (900, 500, game.ZONE_RADIUS, 100), (640, 150, game.ZONE_RADIUS, 200)]
+SPECIAL_HOLE = (640, 400, game.ZONE_RADIUS, 1)
+
+def playfield(shift=(0, 0)):
+    # Textured stand-in for the playfield so ORB finds features, moved by shift like a bumped camera
+    width, height = FRAME_SIZE
+    rng = np.random.default_rng(0)
+    frame = np.full((height, width, 3), 90, dtype=np.uint8)
+    for _ in range(300):
+        x, y = int(rng.integers(width)), int(rng.integers(height))
+        size = int(rng.integers(8, 40))
+        cv2.rectangle(frame, (x, y), (x + size, y + size // 2), rng.integers(0, 256, 3).tolist(), -1)
+    move = np.float32([[1, 0, shift[0]], [0, 1, shift[1]]])
+    return cv2.warpAffine(frame, move, FRAME_SIZE, borderMode=cv2.BORDER_REFLECT)
+
+def calibrated_game():
+    # Only the state finish_calibration uses, without opening a window or a webcam
+    app = game.WhiffleGame.__new__(game.WhiffleGame)
+    app.frame = playfield()
+    app.rectifier = game.Rectifier()
+    app.registration = game.LayoutRegistration()
+    app.point_zones = list(POINT_ZONES)
+    app.special_hole = SPECIAL_HOLE
+    app.calibrating = True
+    app.save_triggered = True
+    app.finish_calibration()
+    app.registration.stop()
+    return app
+
+def test_saved_zones_follow_a_camera_bump():
+    previous_folder = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            app = calibrated_game()
+            assert not app.calibrating and not app.save_triggered
+            assert game.load_point_zones() == (POINT_ZONES, SPECIAL_HOLE)
+
+            registration = game.LayoutRegistration()
+            assert registration.load() and registration.has_reference()
+            registration.check(playfield(BUMP))
+            update = registration.take_update()
+            assert update is not None
+            point_zones, special_hole, moved = update
+            for (x, y, radius, points), (moved_x, moved_y, moved_radius, moved_points) in zip(POINT_ZONES + [SPECIAL_HOLE],
+                                                                                             point_zones + [special_hole]):
+                assert abs(moved_x - (x + BUMP[0])) <= 1 and abs(moved_y - (y + BUMP[1])) <= 1
+                assert (moved_radius, moved_points) == (radius, points)
+            # The move since the last update is what the exclusion mask is warped by
+            center = np.float32([[[x, y] for x, y, _, _ in POINT_ZONES[:1]]])
+            assert np.allclose(cv2.perspectiveTransform(center, moved)[0, 0], center[0, 0] + BUMP, atol=1)
+            assert registration.take_update() is None
+        finally:
+            os.chdir(previous_folder)
+
+def test_invalidated_reference_is_rebuilt():
+    previous_folder = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            app = calibrated_game()
+            app.invalidate_reference()
+            assert app.reference_outdated and not app.registration.has_reference()
+            app.update_reference()
+            app.registration.stop()
+            assert not app.reference_outdated and app.registration.has_reference()
+            assert os.path.exists(game.REGISTRATION_FILE)
+        finally:
+            os.chdir(previous_folder)
+
+if __name__ == "__main__":
+    test_saved_zones_follow_a_camera_bump()
+    test_invalidated_reference_is_rebuilt()
+    print("Registration tests passed")
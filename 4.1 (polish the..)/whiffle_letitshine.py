@@ -2,19 +2,37 @@ import cv2
 import numpy as np
 import json
 import os
+import sys
 import time
-import tkinter as tk
-from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-from collections import OrderedDict
+import argparse
+import socket
+import http.server
+from collections import OrderedDict, deque
 import platform
-import pygame
 import random
-import requests
+import heapq
 import threading
+import types
 
-# Initialize Pygame mixer for sound effects and music
-pygame.mixer.init()
+startup_time = time.perf_counter()
+
+def load_gui_modules():
+    # GUI libraries are only imported when a window is opened, so headless cabinets never load them. pygame is
+    # imported by load_audio_modules behind the splash screen, and requests by the leaderboard functions
+    global tk, ttk, messagebox, Image, ImageTk
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+    from PIL import Image, ImageTk
+
+def load_audio_modules():
+    global pygame
+    import pygame
+
+    # Initialize Pygame mixer for sound effects and music
+    try:
+        pygame.mixer.init()
+    except pygame.error as e:
+        print(f"Error initializing audio: {e}")
 
 # Fixed radius for scoring zones
 ZONE_RADIUS = 20
@@ -26,6 +44,35 @@ TIMED_MODE_DURATION = 120  # 2 minutes
 CALIBRATION_FILE = "whiffle_zones.json"
 HIGH_SCORE_FILE = "whiffle_high_score.json"
 CONFIG_FILE = "whiffle_config.json"
+HOLE_LAYOUT_FILE = "whiffle_holes.json"
+
+# Auto-calibration settings
+HOLE_LAYOUT_RESOLUTION = (1920, 1080)  # Resolution the canonical hole layout was recorded at
+HOLE_MIN_RADIUS = 4
+HOLE_MAX_RADIUS = 30
+HOLE_MIN_CIRCULARITY = 0.6
+AUTO_CALIBRATION_MATCH_DISTANCE = 40  # Max distance from a layout hole to a detected hole (layout pixels)
+AUTO_CALIBRATION_ITERATIONS = 5
+
+# Layout registration settings (keeps zones aligned when the cabinet gets bumped)
+REGISTRATION_FILE = "whiffle_reference.npz"
+REGISTRATION_FEATURES = 1000
+REGISTRATION_WIDTH = 960  # Features are computed on a downscaled copy of the frame
+REGISTRATION_INTERVAL = 2.0  # Seconds between drift checks
+REGISTRATION_MIN_MATCHES = 30
+REGISTRATION_DRIFT_THRESHOLD = 4  # Pixels of zone movement before the zone table is updated
+REGISTRATION_MAX_DRIFT = 200  # Larger shifts are treated as a bad estimate
+
+# Rectification settings (optional top-down view of the playfield)
+RECTIFY_FILE = "whiffle_rectify.npz"
+RECTIFIED_SIZE = (1600, 800)  # Width and height of the canonical top-down playfield
+
+# Exclusion mask settings (rails, lettering and glare that pass the ball colour test)
+EXCLUSION_MASK_FILE = "whiffle_exclusion.png"
+EXCLUSION_LEARN_FRAMES = 30  # Empty-playfield frames sampled when learning the mask
+EXCLUSION_MIN_FRACTION = 0.2  # Pixels detected in at least this share of those frames are excluded
+EXCLUSION_GROW = 7  # Pixels the learned mask is grown by to cover blob edges
+EXCLUSION_BRUSH_RADIUS = 15
 
 # Supabase configuration for online leaderboard
 SUPABASE_URL = "https://jtkbujumrobglftzokcs.supabase.co"
@@ -41,17 +88,113 @@ BALL_COLOR_RANGE = {
 }
 MIN_CONTOUR_AREA = 30
 MIN_RADIUS = 6
+MIN_CIRCULARITY = 0.6
 RED_MIN_CONTOUR_AREA = 50
 RED_MIN_RADIUS = 10
 RED_MIN_CIRCULARITY = 0.85
+SCORE_MIN_CONFIDENCE = 0.5  # Minimum fraction of a ball's enclosing circle that must be filled to score
 RED_BALL_LIMIT = 1
 RED_BALL_COOLDOWN = 2.0
+MASK_BLUR_SIZE = (5, 5)
+MASK_OPEN_ITERATIONS = 2
+DETECTION_COLOR_MODE = "hsv"  # "hsv" (cvtColor + inRange) or "lut" (BGR lookup table), see benchmark_color_lut.py
+COLOR_LUT_BITS = 6  # Bits kept per BGR channel, 64^3 table entries
+CLASS_WHITE = 1
+CLASS_RED = 2
+
+# Hole occupancy settings (a ball must sit in a hole this long before it scores, and leave this long before it can score again)
+HOLE_EMPTY, HOLE_CANDIDATE, HOLE_OCCUPIED, HOLE_SCORED, HOLE_CLEARED = range(5)
+OCCUPANCY_ENTER_FRAMES = 2
+OCCUPANCY_ENTER_TIME = 0.1
+OCCUPANCY_EXIT_FRAMES = 3
+OCCUPANCY_EXIT_TIME = 0.5
+
+# Settled ball settings (a scored ball that sits still in a hole is frozen and only re-checked against a stored patch)
+SETTLE_FRAMES = 15
+SETTLE_MOVE_TOLERANCE = 2.0  # Pixels a ball may wander while counting as stationary
+SETTLE_CHECK_INTERVAL = 5  # Frames between patch checks on a settled ball
+SETTLE_PATCH_DIFF = 20.0  # Mean absolute difference (0-255) at which a settled ball is released
+
+# Tracker settings ("kalman" predicts each ball with a constant-velocity filter so detection can run slower, "centroid" matches nearest positions)
+TRACKER_MODE = "kalman"
+KALMAN_PROCESS_NOISE = 1e6  # Acceleration variance, (px/s^2)^2
+KALMAN_MEASUREMENT_NOISE = 4.0  # Detection position variance, px^2
+KALMAN_INITIAL_VELOCITY_VARIANCE = 4e5  # (px/s)^2, a new ball can already be moving fast in any direction
+KALMAN_GATE = 9.21  # Chi-squared bound on the innovation, 99% for 2 degrees of freedom
+KALMAN_MIN_GATE_DISTANCE = 15  # Pixels, detections this close to the prediction are always allowed
+KALMAN_MAX_DT = 0.5  # Seconds, longer gaps (pauses) are clamped
+MAX_BALL_IDS = 256  # Size of the recycled ID space shared by the tracker and the scorer
+
+# Pyramid detection settings (coarse search, full-resolution confirmation)
+DETECTION_PYRAMID = True
+PYRAMID_MIN_WIDTH = 1920  # Smaller frames are searched at full resolution
+PYRAMID_COARSE_WIDTH = 960
+PYRAMID_COARSE_CIRCULARITY = 0.3  # Tiny coarse blobs have unreliable outlines; the fine pass checks properly
+PYRAMID_WINDOW_DIVISOR = 16  # Confirmation window side is frame height / this
+
+# Background model settings (optional detector that finds balls as changes against the empty playfield)
+DETECTION_BACKGROUND = False
+BACKGROUND_FILE = "whiffle_background.npz"
+BACKGROUND_LEARNING_RATE = 0.02  # Weight of each new frame in the exponential background
+BACKGROUND_THRESHOLD = 40  # Largest per-channel difference (0-255) that still counts as background
+BACKGROUND_TRACK_MARGIN = 10  # Pixels around tracked balls kept out of the background update
+BACKGROUND_SAVE_INTERVAL = 60.0  # Seconds between background snapshots
 
 # Particle effect settings
 PARTICLE_COUNT = 20
 PARTICLE_LIFETIME = 500
 PARTICLE_MAX_SPEED = 5
 PARTICLE_MAX_SIZE = 10
+PARTICLE_CAPACITY = 256  # Fixed pool; the oldest particles are reused when it is full
+PARTICLE_COLORS = np.array([(255, 255, 0), (255, 165, 0), (255, 0, 0)], dtype=np.uint8)  # Yellow, orange, red (RGB)
+
+# Frame pacing settings (display and detection each run on their own monotonic schedule)
+RENDER_FPS = 30
+DETECTION_FPS = 30
+SLOW_MOTION_RENDER_FPS = 20  # Slow Motion lowers the display rate only; detection keeps sampling at DETECTION_FPS
+
+# Renderer settings ("tk" draws on the Tk canvas, "pygame" draws the playfield in its own window for kiosk cabinets)
+RENDERER = "tk"
+PYGAME_FULLSCREEN = True
+PYGAME_WINDOW_SIZE = (1280, 720)  # Used when not fullscreen
+PYGAME_TEXT_CACHE_SIZE = 256  # Rendered text surfaces kept before the cache is cleared
+BORDER_COLORS = {"Slow Motion": "blue", "Score Multiplier": "gold", "Extra Time": "green", "Double Balls": "pink"}
+
+# Headless settings (no window; game events are written as JSON lines)
+HEADLESS_EVENTS_FILE = "whiffle_events.jsonl"
+HEADLESS_EVENTS_ADDRESS = "127.0.0.1:5005"  # Scoreboard host:port for UDP events
+
+# Spectator stream settings (playfield video and live score for TVs and phones on the local network)
+SPECTATOR_ENABLED = False
+SPECTATOR_PORT = 8080
+SPECTATOR_FPS = 10  # Frames encoded per second, shared by every viewer
+SPECTATOR_WIDTH = 960  # Streamed frames are scaled down to this width
+SPECTATOR_JPEG_QUALITY = 70
+SPECTATOR_EVENT_BACKLOG = 50  # Events kept per viewer; a viewer that falls further behind loses the oldest
+SPECTATOR_KEEPALIVE = 15  # Seconds between keepalive comments on idle event streams
+SPECTATOR_PAGE = """<!DOCTYPE html>
+<html><head><meta name="viewport" content="width=device-width, initial-scale=1"><title>Whiffle</title>
+<style>body{margin:0;background:#2E2E2E;color:#fff;font-family:Helvetica,sans-serif;text-align:center}
+img{max-width:100%;max-height:85vh}#score{font-size:8vh;margin:1vh}</style></head>
+<body><div id="score">Score: 0</div><img src="/stream.mjpg" alt="Playfield">
+<script>
+new EventSource("/events").onmessage = function (e) {
+  var event = JSON.parse(e.data);
+  if ("total" in event) document.getElementById("score").textContent = "Score: " + event.total;
+};
+</script></body></html>
+"""
+
+# Sound effect settings (effects are played by one audio thread from a fixed pool of mixer channels)
+SOUND_FILES = {"ball_detected": "ball_detected.wav", "score": "score.wav", "game_start": "game_start.wav"}
+SOUND_COOLDOWNS = {"ball_detected": 0.3, "score": 0.15, "game_start": 1.0}  # Minimum seconds between two plays
+SOUND_CHANNELS = 4  # Mixer channels for effects; when all are busy the longest-playing one is reused
+
+# Startup settings (the splash is shown first; audio, leaderboard and camera start behind it)
+SPLASH_IMAGE = "splash.png"
+SPLASH_CACHE_FILE = "splash_cache.png"  # splash.png scaled to SPLASH_SIZE, written when splash.png is another size
+SPLASH_SIZE = (800, 600)
+SPLASH_MIN_DURATION = 1.5  # Seconds the splash stays up before it closes itself once startup has finished
 
 # Power-up settings
 POWER_UP_SPAWN_INTERVAL = 15
@@ -60,11 +203,19 @@ POWER_UP_MULTIPLIER = 3
 POWER_UP_EXTRA_TIME = 10
 POWER_UP_TYPES = ["Score Multiplier", "Slow Motion", "Extra Time", "Double Balls"]
 
+# Score event log settings (every scoring decision is appended as a fixed-size binary record for replay)
+SCORE_LOG_ENABLED = True
+SCORE_EVENTS_FILE = "whiffle_score_events.bin"
+SCORE_EVENTS_MAGIC = b"WHEV0001"
+SCORE_EVENT_DTYPE = np.dtype([("game", "<u4"), ("time", "<f4"), ("kind", "u1"), ("flags", "u1"), ("zone", "i1"),
+                              ("detail", "u1"), ("points", "<i4"), ("x", "<u2"), ("y", "<u2")])
+EVENT_GAME_START, EVENT_ZONE, EVENT_SPECIAL, EVENT_POWER_UP_ZONE, EVENT_POWER_UP_START, EVENT_POWER_UP_END, EVENT_GAME_END = range(7)
+EVENT_FLAG_RED, EVENT_FLAG_MULTIPLIED, EVENT_FLAG_DOUBLED = 1, 2, 4
+
 # Game state
 current_score = 0
 high_score = 0
 high_score_initials = "N/A"
-scored_ball_ids = set()
 
 # Determine the platform and set the appropriate webcam backend
 system = platform.system()
@@ -94,9 +245,9 @@ def list_webcams():
         index += 1
     return available_cameras
 
-def select_webcam():
+def select_webcam(cameras=None):
     try:
-        cameras = list_webcams()
+        cameras = list_webcams() if cameras is None else cameras
         if not cameras:
             tk.messagebox.showerror("Error", "No webcams found. Please connect a camera and restart.")
             return None
@@ -136,8 +287,419 @@ def save_point_zones(point_zones, special_hole, filename=CALIBRATION_FILE):
         json.dump(data, f, indent=4)
     print(f"Zones saved to {filename}")
 
+def load_hole_layout(filename=HOLE_LAYOUT_FILE):
+    # Canonical 21-hole layout with point values; falls back to the last calibration
+    if os.path.exists(filename):
+        with open(filename, 'r') as f:
+            data = json.load(f)
+            return [(hole['x'], hole['y'], hole['points'], bool(hole.get('is_special'))) for hole in data]
+    if os.path.exists(CALIBRATION_FILE):
+        with open(CALIBRATION_FILE, 'r') as f:
+            data = json.load(f)
+            return [(zone['x'], zone['y'], zone['points'], bool(zone.get('special'))) for zone in data]
+    return []
+
+def detect_hole_candidates(frame):
+    # Holes show up as dark round blobs on an empty playfield
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    scale = frame.shape[0] / HOLE_LAYOUT_RESOLUTION[1]
+
+    params = cv2.SimpleBlobDetector_Params()
+    params.filterByColor = True
+    params.blobColor = 0
+    params.filterByArea = True
+    params.minArea = np.pi * (HOLE_MIN_RADIUS * scale) ** 2
+    params.maxArea = np.pi * (HOLE_MAX_RADIUS * scale) ** 2
+    params.filterByCircularity = True
+    params.minCircularity = HOLE_MIN_CIRCULARITY
+    params.filterByConvexity = False
+    params.filterByInertia = False
+    keypoints = cv2.SimpleBlobDetector_create(params).detect(gray)
+    return np.array([kp.pt for kp in keypoints], dtype=np.float32).reshape(-1, 2)
+
+def match_hole_layout(layout, candidates, frame_shape):
+    # Fit the layout onto the detected holes with a few rounds of nearest-neighbour + similarity transform
+    scale_x = frame_shape[1] / HOLE_LAYOUT_RESOLUTION[0]
+    scale_y = frame_shape[0] / HOLE_LAYOUT_RESOLUTION[1]
+    template = np.array([(x * scale_x, y * scale_y) for x, y, _, _ in layout], dtype=np.float32)
+    transform = np.array([[1, 0, 0], [0, 1, 0]], dtype=np.float32)
+    gate = AUTO_CALIBRATION_MATCH_DISTANCE * scale_x
+
+    for iteration in range(AUTO_CALIBRATION_ITERATIONS):
+        if len(candidates) < 3:
+            break
+        projected = template @ transform[:, :2].T + transform[:, 2]
+        D = np.linalg.norm(projected[:, None, :] - candidates[None, :, :], axis=2)
+        nearest = D.argmin(axis=1)
+        # Start with a wide gate so a bumped camera still converges, then tighten
+        inliers = D[np.arange(len(template)), nearest] <= gate * (2 if iteration == 0 else 1)
+        if inliers.sum() < 3:
+            break
+        estimate, _ = cv2.estimateAffinePartial2D(template[inliers], candidates[nearest[inliers]],
+                                                  method=cv2.RANSAC, ransacReprojThreshold=gate / 2)
+        if estimate is None:
+            break
+        transform = estimate.astype(np.float32)
+
+    projected = template @ transform[:, :2].T + transform[:, 2]
+    positions = projected.copy()
+    matched = 0
+    if len(candidates):
+        D = np.linalg.norm(projected[:, None, :] - candidates[None, :, :], axis=2)
+        rows = D.min(axis=1).argsort()
+        cols = D.argmin(axis=1)[rows]
+        used_cols = set()
+        for row, col in zip(rows, cols):
+            if col in used_cols or D[row, col] > gate:
+                continue
+            positions[row] = candidates[col]
+            used_cols.add(col)
+            matched += 1
+
+    point_zones = []
+    special_hole = None
+    for (x, y), (_, _, points, is_special) in zip(positions, layout):
+        zone = (int(round(x)), int(round(y)), ZONE_RADIUS, points)
+        if is_special and special_hole is None:
+            special_hole = zone
+        else:
+            point_zones.append(zone)
+    return point_zones, special_hole, matched
+
+def auto_calibrate(frame, layout):
+    start_time = time.time()
+    candidates = detect_hole_candidates(frame)
+    point_zones, special_hole, matched = match_hole_layout(layout, candidates, frame.shape)
+    print(f"Auto-calibration: {len(candidates)} candidates, matched {matched}/{len(layout)} holes "
+          f"in {(time.time() - start_time) * 1000:.0f}ms")
+    return point_zones, special_hole, matched
+
+class LayoutRegistration:
+    def __init__(self):
+        self.orb = cv2.ORB_create(REGISTRATION_FEATURES)
+        self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+        self.reference_frame = None
+        self.reference_points = None
+        self.reference_descriptors = None
+        self.reference_zones = []
+        self.reference_special = None
+        self.applied_homography = np.eye(3)
+        self.latest_frame = None
+        self.pending_update = None
+        self.lock = threading.Lock()
+        self.generation = 0  # Bumped whenever the reference changes, so checks against an older one are discarded
+        self.running = False
+
+    def has_reference(self):
+        return self.reference_descriptors is not None and len(self.reference_descriptors) >= REGISTRATION_MIN_MATCHES
+
+    def compute_features(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        scale = min(1.0, REGISTRATION_WIDTH / gray.shape[1])
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        keypoints, descriptors = self.orb.detectAndCompute(gray, None)
+        points = np.array([kp.pt for kp in keypoints], dtype=np.float32).reshape(-1, 2) / scale
+        return gray, points, descriptors
+
+    def set_reference(self, frame, point_zones, special_hole):
+        gray, points, descriptors = self.compute_features(frame)
+        with self.lock:
+            self.reference_frame = gray
+            self.reference_points = points
+            self.reference_descriptors = descriptors
+            self.reference_zones = list(point_zones)
+            self.reference_special = special_hole
+            self.applied_homography = np.eye(3)
+            self.pending_update = None
+            self.generation += 1
+        print(f"Registration reference set with {len(points)} keypoints")
+
+    def clear_reference(self):
+        with self.lock:
+            self.reference_descriptors = None
+            self.pending_update = None
+            self.generation += 1
+
+    def save(self, filename=REGISTRATION_FILE):
+        if not self.has_reference():
+            return
+        special = np.array(self.reference_special if self.reference_special else [], dtype=np.int32)
+        np.savez_compressed(filename, frame=self.reference_frame, points=self.reference_points,
+                            descriptors=self.reference_descriptors,
+                            zones=np.array(self.reference_zones, dtype=np.int32).reshape(-1, 4), special=special)
+        print(f"Registration reference saved to {filename}")
+
+    def load(self, filename=REGISTRATION_FILE):
+        if not os.path.exists(filename):
+            return False
+        try:
+            data = np.load(filename)
+            with self.lock:
+                self.reference_frame = data["frame"]
+                self.reference_points = data["points"]
+                self.reference_descriptors = data["descriptors"]
+                self.reference_zones = [tuple(int(v) for v in zone) for zone in data["zones"]]
+                self.reference_special = tuple(int(v) for v in data["special"]) if data["special"].size else None
+                self.applied_homography = np.eye(3)
+                self.generation += 1
+            print(f"Registration reference loaded from {filename}")
+            return True
+        except Exception as e:
+            print(f"Error loading registration reference: {e}")
+            return False
+
+    def estimate_homography(self, frame, reference_points, reference_descriptors):
+        _, points, descriptors = self.compute_features(frame)
+        if descriptors is None or len(descriptors) < REGISTRATION_MIN_MATCHES:
+            return None
+        matches = self.matcher.match(reference_descriptors, descriptors)
+        if len(matches) < REGISTRATION_MIN_MATCHES:
+            return None
+        source = reference_points[[m.queryIdx for m in matches]]
+        target = points[[m.trainIdx for m in matches]]
+        homography, inliers = cv2.findHomography(source, target, cv2.RANSAC, 3.0)
+        if homography is None or inliers.sum() < REGISTRATION_MIN_MATCHES:
+            return None
+        return homography
+
+    def transform_zones(self, homography):
+        zones = self.reference_zones + ([self.reference_special] if self.reference_special else [])
+        if not zones:
+            return [], None
+        centers = np.array([(x, y) for x, y, _, _ in zones], dtype=np.float32).reshape(-1, 1, 2)
+        moved = cv2.perspectiveTransform(centers, homography).reshape(-1, 2)
+        transformed = [(int(round(x)), int(round(y)), radius, points) for (x, y), (_, _, radius, points) in zip(moved, zones)]
+        if self.reference_special:
+            return transformed[:-1], transformed[-1]
+        return transformed, None
+
+    def zone_drift(self, homography, baseline):
+        # Largest distance any zone center moves between the baseline and the new homography
+        zones = self.reference_zones + ([self.reference_special] if self.reference_special else [])
+        if not zones:
+            return 0.0
+        centers = np.array([(x, y) for x, y, _, _ in zones], dtype=np.float32).reshape(-1, 1, 2)
+        current = cv2.perspectiveTransform(centers, baseline).reshape(-1, 2)
+        moved = cv2.perspectiveTransform(centers, homography).reshape(-1, 2)
+        return float(np.max(np.linalg.norm(moved - current, axis=1)))
+
+    def check(self, frame):
+        # The reference is read under the lock and the result is only published if it is still the same reference
+        with self.lock:
+            if not self.has_reference():
+                return
+            generation = self.generation
+            reference_points, reference_descriptors = self.reference_points, self.reference_descriptors
+        homography = self.estimate_homography(frame, reference_points, reference_descriptors)
+        if homography is None:
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            if self.zone_drift(homography, np.eye(3)) > REGISTRATION_MAX_DRIFT:
+                print("Registration rejected: estimated shift is too large")
+                return
+            drift = self.zone_drift(homography, self.applied_homography)
+            if drift > REGISTRATION_DRIFT_THRESHOLD:
+                # The update carries the move since the last update too, for anything drawn in frame coordinates
+                moved = homography @ np.linalg.inv(self.applied_homography)
+                self.applied_homography = homography
+                self.pending_update = (*self.transform_zones(homography), moved)
+                print(f"Playfield moved {drift:.1f}px, updating zones")
+
+    def submit_frame(self, frame):
+        self.latest_frame = frame
+
+    def take_update(self):
+        with self.lock:
+            update, self.pending_update = self.pending_update, None
+        return update
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self.registration_thread, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def registration_thread(self):
+        while self.running:
+            frame, self.latest_frame = self.latest_frame, None
+            if frame is not None:
+                try:
+                    self.check(frame)
+                except Exception as e:
+                    print(f"Registration error: {e}")
+            time.sleep(REGISTRATION_INTERVAL)
+
+class Rectifier:
+    def __init__(self):
+        self.corners = None
+        self.frame_size = None
+        self.homography = None
+        self.map1 = None
+        self.map2 = None
+
+    def is_enabled(self):
+        return self.map1 is not None
+
+    def configure(self, corners, frame_size):
+        # Maps are built once here; every frame afterwards costs a single cv2.remap
+        width, height = RECTIFIED_SIZE
+        destination = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+        self.corners = np.float32(corners)
+        self.frame_size = tuple(frame_size)
+        self.homography = cv2.getPerspectiveTransform(self.corners, destination)
+        grid_x, grid_y = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+        grid = np.stack([grid_x, grid_y], axis=-1).reshape(-1, 1, 2)
+        source = cv2.perspectiveTransform(grid, np.linalg.inv(self.homography)).reshape(height, width, 2)
+        self.map1, self.map2 = cv2.convertMaps(source[..., 0], source[..., 1], cv2.CV_16SC2)
+        print(f"Rectification maps built for {frame_size[0]}x{frame_size[1]} -> {width}x{height}")
+
+    def clear(self, filename=RECTIFY_FILE):
+        self.corners = self.frame_size = self.homography = self.map1 = self.map2 = None
+        if os.path.exists(filename):
+            os.remove(filename)
+
+    def save(self, filename=RECTIFY_FILE):
+        if not self.is_enabled():
+            return
+        np.savez_compressed(filename, corners=self.corners, frame_size=np.array(self.frame_size),
+                            rectified_size=np.array(RECTIFIED_SIZE), homography=self.homography,
+                            map1=self.map1, map2=self.map2)
+        print(f"Rectification saved to {filename}")
+
+    def load(self, frame_size, filename=RECTIFY_FILE):
+        if not os.path.exists(filename):
+            return False
+        try:
+            data = np.load(filename)
+            stored_size = tuple(int(v) for v in data["frame_size"])
+            if stored_size == tuple(frame_size) and tuple(data["rectified_size"]) == RECTIFIED_SIZE:
+                self.corners = data["corners"]
+                self.frame_size = stored_size
+                self.homography = data["homography"]
+                self.map1, self.map2 = data["map1"], data["map2"]
+                print(f"Rectification loaded from {filename}")
+            else:
+                # Camera resolution changed; scale the corners and rebuild the cached maps
+                scale = np.float32([frame_size[0] / stored_size[0], frame_size[1] / stored_size[1]])
+                self.configure(data["corners"] * scale, frame_size)
+                self.save(filename)
+            return True
+        except Exception as e:
+            print(f"Error loading rectification: {e}")
+            return False
+
+    def rectify(self, frame):
+        return cv2.remap(frame, self.map1, self.map2, cv2.INTER_LINEAR)
+
+    def transform_zone(self, zone, homography):
+        if zone is None:
+            return None
+        x, y, radius, points = zone
+        moved = cv2.perspectiveTransform(np.float32([[[x, y]]]), homography)[0, 0]
+        return (int(round(moved[0])), int(round(moved[1])), radius, points)
+
+    def to_rectified(self, point_zones, special_hole):
+        return ([self.transform_zone(zone, self.homography) for zone in point_zones],
+                self.transform_zone(special_hole, self.homography))
+
+    def to_camera(self, point_zones, special_hole):
+        inverse = np.linalg.inv(self.homography)
+        return ([self.transform_zone(zone, inverse) for zone in point_zones],
+                self.transform_zone(special_hole, inverse))
+
+class ExclusionMask:
+    # Marks the parts of the playfield that keep passing the ball colour test. keep is 255 where detection is
+    # allowed and 0 where it is excluded, at the resolution detection runs at (the rectified view when enabled)
+    def __init__(self):
+        self.keep = None
+        self.learning = False
+        self.counts = None
+        self.learned_frames = 0
+
+    def is_enabled(self):
+        return self.keep is not None
+
+    def fit(self, shape):
+        # Follow camera resolution changes
+        if self.keep is not None and self.keep.shape != shape[:2]:
+            self.keep = cv2.resize(self.keep, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
+        return self.keep
+
+    def start_learning(self):
+        self.learning = True
+        self.counts = None
+        self.learned_frames = 0
+
+    def learn(self, mask_white, mask_red):
+        # Count how often each pixel of the empty playfield comes up as a ball colour
+        if self.counts is None or self.counts.shape != mask_white.shape:
+            self.counts = np.zeros(mask_white.shape, dtype=np.uint16)
+            self.learned_frames = 0
+        self.counts += (mask_white > 0) | (mask_red > 0)
+        self.learned_frames += 1
+        return self.learned_frames >= EXCLUSION_LEARN_FRAMES
+
+    def finish_learning(self, point_zones, special_hole):
+        excluded = np.where(self.counts >= EXCLUSION_MIN_FRACTION * self.learned_frames, 255, 0).astype(np.uint8)
+        excluded = cv2.dilate(excluded, np.ones((2 * EXCLUSION_GROW + 1, 2 * EXCLUSION_GROW + 1), dtype=np.uint8))
+        # Holes must stay detectable even if their rims light up
+        for x, y, radius, _ in list(point_zones) + ([special_hole] if special_hole else []):
+            cv2.circle(excluded, (int(x), int(y)), int(radius), 0, -1)
+        self.keep = cv2.bitwise_not(excluded)
+        self.learning = False
+        self.counts = None
+        return np.count_nonzero(excluded) / excluded.size
+
+    def warp(self, homography):
+        # Follow the playfield when registration finds that it moved; uncovered edges are not excluded. Counts
+        # from a learning pass in progress belong to the old position, so learning starts over
+        if self.keep is not None:
+            height, width = self.keep.shape
+            self.keep = cv2.warpPerspective(self.keep, homography, (width, height), flags=cv2.INTER_NEAREST,
+                                            borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+        if self.learning:
+            self.counts = None
+            self.learned_frames = 0
+
+    def paint(self, x, y, shape, exclude=True):
+        if self.keep is None:
+            self.keep = np.full(shape[:2], 255, dtype=np.uint8)
+        cv2.circle(self.keep, (int(x), int(y)), EXCLUSION_BRUSH_RADIUS, 0 if exclude else 255, -1)
+
+    def clear(self, filename=EXCLUSION_MASK_FILE):
+        self.keep = None
+        self.learning = False
+        self.counts = None
+        if os.path.exists(filename):
+            os.remove(filename)
+
+    def save(self, filename=EXCLUSION_MASK_FILE):
+        if not self.is_enabled():
+            return
+        cv2.imwrite(filename, self.keep)
+        print(f"Exclusion mask saved to {filename}")
+
+    def load(self, filename=EXCLUSION_MASK_FILE):
+        if not os.path.exists(filename):
+            return False
+        keep = cv2.imread(filename, cv2.IMREAD_GRAYSCALE)
+        if keep is None:
+            print(f"Error loading exclusion mask from {filename}")
+            return False
+        self.keep = keep
+        print(f"Exclusion mask loaded from {filename}")
+        return True
+
 def load_high_score():
     global high_score, high_score_initials
+    import requests
     try:
         headers = {"apikey": SUPABASE_API_KEY, "Authorization": f"Bearer {SUPABASE_API_KEY}"}
         response = requests.get(LEADERBOARD_ENDPOINT, headers=headers, params={"order": "score.desc", "limit": 5})
@@ -160,6 +722,7 @@ def load_high_score():
 
 def save_high_score(initials="N/A", new_score=None, leaderboard=None):
     global high_score, high_score_initials
+    import requests
     if new_score is None:
         return
 
@@ -200,6 +763,7 @@ def save_high_score(initials="N/A", new_score=None, leaderboard=None):
         high_score_initials = leaderboard[0]["initials"]
 
 def retry_upload(initials, score):
+    import requests
     time.sleep(10)
     headers = {
         "apikey": SUPABASE_API_KEY,
@@ -256,21 +820,78 @@ def set_webcam_resolution(cap):
     print("Failed to set any resolution from the list.")
     return None, None, None
 
+def open_webcam(index):
+    cap = cv2.VideoCapture(index, WEBCAM_BACKEND)
+    if not cap.isOpened():
+        print(f"Failed to open webcam with backend {WEBCAM_BACKEND}, trying alternate backend {ALTERNATE_WEBCAM_BACKEND}")
+        cap = cv2.VideoCapture(index, ALTERNATE_WEBCAM_BACKEND)
+    if not cap.isOpened():
+        raise Exception("Could not open webcam with any backend.")
+    width, height, frame = set_webcam_resolution(cap)
+    if width is None:
+        cap.release()
+        raise Exception("Could not set resolution.")
+    return cap, width, height, frame
+
+class BallIdAllocator:
+    # Fixed pool of ball IDs shared by the tracker and the scorer. IDs are recycled oldest-released first, and each
+    # one carries a generation that is bumped on release, so (ID, generation) keys never collide across reuse and a
+    # recycled ID never inherits the scored flag of the ball that held it before
+    def __init__(self, size=MAX_BALL_IDS):
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        self.free = deque(range(self.size))
+        self.generation = np.zeros(self.size, dtype=np.uint32)
+        self.scored = np.zeros(self.size, dtype=bool)
+
+    def allocate(self):
+        if not self.free:
+            print(f"All {self.size} ball IDs are in use, ignoring new object")
+            return None
+        return self.free.popleft()
+
+    def release(self, ball_id):
+        self.generation[ball_id] += 1
+        self.scored[ball_id] = False
+        self.free.append(ball_id)
+
+    def key(self, ball_id):
+        return ball_id, int(self.generation[ball_id])
+
+    def is_scored(self, ball_id):
+        return self.scored[ball_id]
+
+    def mark_scored(self, ball_id):
+        self.scored[ball_id] = True
+
+ball_ids = BallIdAllocator()
+
 class CentroidTracker:
-    def __init__(self, max_disappeared=5):
-        self.next_object_id = 0
+    def __init__(self, max_disappeared=5, allocator=None):
+        self.allocator = allocator if allocator is not None else BallIdAllocator()
         self.objects = OrderedDict()
         self.disappeared = OrderedDict()
         self.max_disappeared = max_disappeared
 
     def register(self, centroid):
-        self.objects[self.next_object_id] = centroid
-        self.disappeared[self.next_object_id] = 0
-        self.next_object_id += 1
+        object_id = self.allocator.allocate()
+        if object_id is None:
+            return
+        self.objects[object_id] = centroid
+        self.disappeared[object_id] = 0
 
-    def deregister(self, object_id):
+    def deregister(self, object_id, release=True):
         del self.objects[object_id]
         del self.disappeared[object_id]
+        if release:
+            self.allocator.release(object_id)
+
+    def restore(self, object_id, centroid):
+        # Hand a released settled ball back to the tracker under its original ID
+        self.objects[object_id] = centroid
+        self.disappeared[object_id] = 0
 
     def update(self, centroids):
         if not centroids:
@@ -317,175 +938,1455 @@ class CentroidTracker:
 
         return self.objects
 
-def detect_and_track_balls(frame, tracker):
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-    blurred = cv2.GaussianBlur(hsv, (5, 5), 0)
-    
-    lower_white = np.array(BALL_COLOR_RANGE["lower_white"])
-    upper_white = np.array(BALL_COLOR_RANGE["upper_white"])
-    mask_white = cv2.inRange(blurred, lower_white, upper_white)
-    mask_white = cv2.erode(mask_white, None, iterations=2)
-    mask_white = cv2.dilate(mask_white, None, iterations=2)
-    contours_white, _ = cv2.findContours(mask_white, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    lower_red = np.array(BALL_COLOR_RANGE["lower_red"])
-    upper_red = np.array(BALL_COLOR_RANGE["upper_red"])
-    mask_red = cv2.inRange(blurred, lower_red, upper_red)
-    mask_red = cv2.erode(mask_red, None, iterations=2)
-    mask_red = cv2.dilate(mask_red, None, iterations=2)
-    contours_red, _ = cv2.findContours(mask_red, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+class KalmanTracker:
+    # Same interface as CentroidTracker, but every object carries a constant-velocity Kalman filter (x, y, vx, vy).
+    # Detections are matched against the predicted positions, gated on the innovation, so fast balls keep their
+    # IDs at low detection rates. All tracks are predicted and corrected together as arrays
+    def __init__(self, max_disappeared=5, allocator=None):
+        self.allocator = allocator if allocator is not None else BallIdAllocator()
+        self.objects = OrderedDict()
+        self.disappeared = OrderedDict()
+        self.max_disappeared = max_disappeared
+        self.ids = []
+        self.state = np.zeros((0, 4))
+        self.covariance = np.zeros((0, 4, 4))
+        self.last_update = None
+
+    def start_track(self, object_id, centroid):
+        self.objects[object_id] = centroid
+        self.disappeared[object_id] = 0
+        self.ids.append(object_id)
+        self.state = np.vstack([self.state, [centroid[0], centroid[1], 0.0, 0.0]])
+        covariance = np.diag([KALMAN_MEASUREMENT_NOISE, KALMAN_MEASUREMENT_NOISE,
+                              KALMAN_INITIAL_VELOCITY_VARIANCE, KALMAN_INITIAL_VELOCITY_VARIANCE])
+        self.covariance = np.concatenate([self.covariance, covariance[None]])
+
+    def register(self, centroid):
+        object_id = self.allocator.allocate()
+        if object_id is not None:
+            self.start_track(object_id, centroid)
+
+    def deregister(self, object_id, release=True):
+        del self.objects[object_id]
+        del self.disappeared[object_id]
+        row = self.ids.index(object_id)
+        del self.ids[row]
+        self.state = np.delete(self.state, row, axis=0)
+        self.covariance = np.delete(self.covariance, row, axis=0)
+        if release:
+            self.allocator.release(object_id)
+
+    def restore(self, object_id, centroid):
+        # Hand a released settled ball back to the tracker under its original ID
+        self.start_track(object_id, centroid)
+
+    def predict(self, dt):
+        transition = np.eye(4)
+        transition[0, 2] = transition[1, 3] = dt
+        # White-noise acceleration model, applied to x and y independently
+        noise = np.zeros((4, 4))
+        noise[[0, 1], [0, 1]] = dt ** 4 / 4
+        noise[[0, 1], [2, 3]] = noise[[2, 3], [0, 1]] = dt ** 3 / 2
+        noise[[2, 3], [2, 3]] = dt ** 2
+        self.state = self.state @ transition.T
+        self.covariance = transition @ self.covariance @ transition.T + noise * KALMAN_PROCESS_NOISE
+
+    def associate(self, detections):
+        # Greedy matching on Mahalanobis distance; a pair is allowed inside the chi-squared gate or the pixel floor
+        innovation_covariance = self.covariance[:, :2, :2] + np.eye(2) * KALMAN_MEASUREMENT_NOISE
+        difference = detections[None, :, :] - self.state[:, None, :2]
+        mahalanobis = np.einsum("nmi,nij,nmj->nm", difference, np.linalg.inv(innovation_covariance), difference)
+        allowed = (mahalanobis <= KALMAN_GATE) | (np.linalg.norm(difference, axis=2) <= KALMAN_MIN_GATE_DISTANCE)
+        rows, cols = np.nonzero(allowed)
+        order = np.argsort(mahalanobis[rows, cols])
+        used_rows, used_cols = set(), set()
+        matches = []
+        for row, col in zip(rows[order], cols[order]):
+            if row in used_rows or col in used_cols:
+                continue
+            used_rows.add(row)
+            used_cols.add(col)
+            matches.append((row, col))
+        return matches
+
+    def correct(self, rows, detections):
+        covariance = self.covariance[rows]
+        innovation_covariance = covariance[:, :2, :2] + np.eye(2) * KALMAN_MEASUREMENT_NOISE
+        gain = covariance[:, :, :2] @ np.linalg.inv(innovation_covariance)
+        innovation = detections - self.state[rows, :2]
+        self.state[rows] += (gain @ innovation[:, :, None])[:, :, 0]
+        self.covariance[rows] = covariance - gain @ covariance[:, :2, :]
+
+    def update(self, centroids, now=None):
+        now = time.monotonic() if now is None else now
+        dt = 0.0 if self.last_update is None else min(now - self.last_update, KALMAN_MAX_DT)
+        self.last_update = now
+        if self.ids:
+            self.predict(dt)
+
+        detections = np.array(centroids, dtype=np.float64).reshape(-1, 2)
+        matches = self.associate(detections) if self.ids and len(detections) else []
+        matched_rows = np.array([row for row, _ in matches], dtype=np.intp)
+        matched_cols = np.array([col for _, col in matches], dtype=np.intp)
+        if len(matches):
+            self.correct(matched_rows, detections[matched_cols])
+
+        # Matched objects report the detection itself so callers can pair it with the ball; the rest coast on the prediction
+        matched = dict(zip(matched_rows.tolist(), matched_cols.tolist()))
+        for row, object_id in enumerate(list(self.ids)):
+            if row in matched:
+                self.objects[object_id] = centroids[matched[row]]
+                self.disappeared[object_id] = 0
+            else:
+                self.objects[object_id] = (float(self.state[row, 0]), float(self.state[row, 1]))
+                self.disappeared[object_id] += 1
+        for object_id in [object_id for object_id in self.ids if self.disappeared[object_id] > self.max_disappeared]:
+            self.deregister(object_id)
+
+        used_cols = set(matched_cols.tolist())
+        for col in range(len(centroids)):
+            if col not in used_cols:
+                self.register(centroids[col])
+
+        return self.objects
+
+
+def create_tracker():
+    if TRACKER_MODE == "kalman":
+        return KalmanTracker(max_disappeared=5, allocator=ball_ids)
+    return CentroidTracker(max_disappeared=5, allocator=ball_ids)
+
+def build_color_lut(color_range, bits=COLOR_LUT_BITS):
+    # Evaluate the HSV ranges once at the center of every quantized BGR cell
+    levels = 1 << bits
+    step = 256 // levels
+    values = np.arange(levels, dtype=np.uint8) * step + step // 2
+    b, g, r = np.meshgrid(values, values, values, indexing="ij")
+    bgr = np.stack([b, g, r], axis=-1).reshape(-1, 1, 3)
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+    white = cv2.inRange(hsv, np.array(color_range["lower_white"]), np.array(color_range["upper_white"])).ravel() > 0
+    red = cv2.inRange(hsv, np.array(color_range["lower_red"]), np.array(color_range["upper_red"])).ravel() > 0
+    lut = np.zeros(levels ** 3, dtype=np.uint8)
+    lut[white] |= CLASS_WHITE
+    lut[red] |= CLASS_RED
+    return lut
+
+class BallDetector:
+    # Holds every intermediate image for the current resolution so steady-state masking allocates nothing
+    def __init__(self, mode=DETECTION_COLOR_MODE, open_iterations=MASK_OPEN_ITERATIONS):
+        self.mode = mode
+        self.open_iterations = open_iterations
+        self.shape = None
+        self.kernel = np.ones((3, 3), dtype=np.uint8)
+        self.update_thresholds()
+
+    def update_thresholds(self):
+        self.lower_white = np.array(BALL_COLOR_RANGE["lower_white"], dtype=np.uint8)
+        self.upper_white = np.array(BALL_COLOR_RANGE["upper_white"], dtype=np.uint8)
+        self.lower_red = np.array(BALL_COLOR_RANGE["lower_red"], dtype=np.uint8)
+        self.upper_red = np.array(BALL_COLOR_RANGE["upper_red"], dtype=np.uint8)
+        self.lut = build_color_lut(BALL_COLOR_RANGE)
+
+    def allocate(self, shape):
+        height, width = shape[:2]
+        self.hsv = np.empty((height, width, 3), dtype=np.uint8)
+        self.blurred = np.empty((height, width, 3), dtype=np.uint8)
+        self.quantized = np.empty((height, width, 3), dtype=np.uint8)
+        self.lut_index = np.empty((height, width), dtype=np.int32)
+        self.lut_scratch = np.empty((height, width), dtype=np.int32)
+        self.labels = np.empty((height, width), dtype=np.uint8)
+        self.mask_white = np.empty((height, width), dtype=np.uint8)
+        self.mask_red = np.empty((height, width), dtype=np.uint8)
+        self.shape = shape
+        print(f"Detector buffers allocated for {width}x{height}")
+
+    def masks(self, frame, keep=None):
+        # keep is an optional exclusion mask (255 where detection is allowed) ANDed in before the morphology
+        if frame.shape != self.shape:
+            self.allocate(frame.shape)
+        if self.mode == "lut":
+            return self.lut_masks(frame, keep)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=self.hsv)
+        cv2.GaussianBlur(self.hsv, MASK_BLUR_SIZE, 0, dst=self.blurred)
+        cv2.inRange(self.blurred, self.lower_white, self.upper_white, dst=self.mask_white)
+        if keep is not None:
+            cv2.bitwise_and(self.mask_white, keep, dst=self.mask_white)
+        cv2.morphologyEx(self.mask_white, cv2.MORPH_OPEN, self.kernel, dst=self.mask_white, iterations=self.open_iterations)
+        cv2.inRange(self.blurred, self.lower_red, self.upper_red, dst=self.mask_red)
+        if keep is not None:
+            cv2.bitwise_and(self.mask_red, keep, dst=self.mask_red)
+        cv2.morphologyEx(self.mask_red, cv2.MORPH_OPEN, self.kernel, dst=self.mask_red, iterations=self.open_iterations)
+        return self.mask_white, self.mask_red
+
+    def classify(self, frame):
+        # One table lookup per pixel turns quantized BGR straight into class bits
+        shift = 8 - COLOR_LUT_BITS
+        np.right_shift(frame, shift, out=self.quantized)
+        np.left_shift(self.quantized[..., 0], 2 * COLOR_LUT_BITS, out=self.lut_index, dtype=np.int32)
+        np.left_shift(self.quantized[..., 1], COLOR_LUT_BITS, out=self.lut_scratch, dtype=np.int32)
+        np.bitwise_or(self.lut_index, self.lut_scratch, out=self.lut_index)
+        np.bitwise_or(self.lut_index, self.quantized[..., 2], out=self.lut_index, dtype=np.int32)
+        np.take(self.lut, self.lut_index, out=self.labels)
+        return self.labels
+
+    def lut_masks(self, frame, keep=None):
+        cv2.GaussianBlur(frame, MASK_BLUR_SIZE, 0, dst=self.blurred)
+        labels = self.classify(self.blurred)
+        cv2.compare(cv2.bitwise_and(labels, CLASS_WHITE, dst=self.mask_white), 0, cv2.CMP_GT, dst=self.mask_white)
+        if keep is not None:
+            cv2.bitwise_and(self.mask_white, keep, dst=self.mask_white)
+        cv2.morphologyEx(self.mask_white, cv2.MORPH_OPEN, self.kernel, dst=self.mask_white, iterations=self.open_iterations)
+        cv2.compare(cv2.bitwise_and(labels, CLASS_RED, dst=self.mask_red), 0, cv2.CMP_GT, dst=self.mask_red)
+        if keep is not None:
+            cv2.bitwise_and(self.mask_red, keep, dst=self.mask_red)
+        cv2.morphologyEx(self.mask_red, cv2.MORPH_OPEN, self.kernel, dst=self.mask_red, iterations=self.open_iterations)
+        return self.mask_white, self.mask_red
+
+    def candidates(self, frame, keep=None):
+        mask_white, mask_red = self.masks(frame, keep)
+        white_candidates = localize_blobs(frame, mask_white, extract_blobs(mask_white, MIN_CONTOUR_AREA, MIN_RADIUS, MIN_CIRCULARITY))
+        red_candidates = localize_blobs(frame, mask_red, extract_blobs(mask_red, RED_MIN_CONTOUR_AREA, RED_MIN_RADIUS,
+                                                                        RED_MIN_CIRCULARITY, limit=RED_BALL_LIMIT))
+        return white_candidates, red_candidates
+
+def extract_blobs(mask, min_area, min_radius, min_circularity, limit=None):
+    # Returns an (N, 3) float32 array of x, y, radius for every accepted blob
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return np.empty((0, 3), dtype=np.float32)
+
+    # Area, perimeter and bounding box for all contours at once from the concatenated point list
+    lengths = np.fromiter((len(c) for c in contours), dtype=np.intp, count=len(contours))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.float64)
+    next_index = np.arange(1, len(points) + 1)
+    next_index[starts + lengths - 1] = starts
+    next_points = points[next_index]
+    areas = np.abs(np.add.reduceat(points[:, 0] * next_points[:, 1] - next_points[:, 0] * points[:, 1], starts)) / 2
+    perimeters = np.add.reduceat(np.hypot(*(next_points - points).T), starts)
+    extents = np.maximum.reduceat(points, starts) - np.minimum.reduceat(points, starts)
+    circularities = np.divide(4 * np.pi * areas, perimeters ** 2, out=np.zeros_like(areas), where=perimeters > 0)
+    # Half the box diagonal bounds the enclosing radius from above, so only survivors need minEnclosingCircle
+    survivors = np.flatnonzero((areas > min_area) & (circularities > min_circularity)
+                               & (np.hypot(extents[:, 0], extents[:, 1]) / 2 > min_radius))
+
+    candidates = []
+    for index in survivors:
+        ((x, y), radius) = cv2.minEnclosingCircle(contours[index])
+        if radius > min_radius:
+            candidates.append((x, y, radius))
+            if limit is not None and len(candidates) >= limit:
+                break
+    return np.array(candidates, dtype=np.float32).reshape(-1, 3)
+
+def localize_blobs(frame, mask, blobs):
+    # Intensity-weighted moments over each blob's disk, batched by window size so one large glare blob does not
+    # size every ball's window. Returns an (N, 4) float32 array of sub-pixel x, y, radius and a 0-1 fill confidence
+    localized = np.empty((len(blobs), 4), dtype=np.float32)
+    if not len(blobs):
+        return localized
+    # Blobs within a factor of two in radius share a batch, sized to the largest of them
+    sizes = np.ceil(np.log2(np.maximum(blobs[:, 2], 1))).astype(np.intp)
+    for size in np.unique(sizes):
+        batch = np.flatnonzero(sizes == size)
+        localized[batch] = localize_blob_batch(frame, mask, blobs[batch], int(np.ceil(blobs[batch, 2].max())))
+    return localized
+
+def localize_blob_batch(frame, mask, blobs, half):
+    # Moments for blobs that all fit a (2 * half + 1) square window
+    height, width = mask.shape[:2]
+    offsets = np.arange(-half, half + 1)
+    centers = np.round(blobs[:, :2]).astype(np.intp)
+    xs = centers[:, 0, None] + offsets
+    ys = centers[:, 1, None] + offsets
+    # Window pixels off the frame are clipped to the edge for indexing but never counted, whatever the window size
+    in_frame = ((ys >= 0) & (ys < height))[:, :, None] & ((xs >= 0) & (xs < width))[:, None, :]
+    rows, cols = np.clip(ys, 0, height - 1)[:, :, None], np.clip(xs, 0, width - 1)[:, None, :]
+    inside = (((cols - blobs[:, 0, None, None]) ** 2 + (rows - blobs[:, 1, None, None]) ** 2) <= blobs[:, 2, None, None] ** 2) & in_frame
+    covered = (mask[rows, cols] > 0) & inside
+    weights = frame[rows, cols].max(axis=-1) * covered.astype(np.float32)
+    m00 = weights.sum(axis=(1, 2))
+    found = m00 > 0
+    safe_m00 = np.where(found, m00, 1)
+    x = np.where(found, (weights * cols).sum(axis=(1, 2)) / safe_m00, blobs[:, 0])
+    y = np.where(found, (weights * rows).sum(axis=(1, 2)) / safe_m00, blobs[:, 1])
+    confidence = np.minimum(covered.sum(axis=(1, 2)) / (np.pi * blobs[:, 2] ** 2), 1.0)
+    return np.stack([x, y, blobs[:, 2], confidence], axis=1).astype(np.float32)
+
+class PyramidDetector:
+    # Finds candidates on a downscaled frame, then confirms each one in a small full-resolution window,
+    # so full-resolution work scales with the number of balls instead of the number of pixels
+    def __init__(self, mode=DETECTION_COLOR_MODE):
+        self.full = BallDetector(mode)
+        self.coarse = BallDetector(mode, open_iterations=1)
+        self.window = BallDetector(mode)
+        self.small = None
+        self.small_keep = None
+
+    def update_thresholds(self):
+        self.full.update_thresholds()
+        self.coarse.update_thresholds()
+        self.window.update_thresholds()
+
+    def masks(self, frame, keep=None):
+        return self.full.masks(frame, keep)
+
+    def coarse_candidates(self, frame, scale, keep=None):
+        height, width = frame.shape[:2]
+        size = (width // scale, height // scale)
+        if self.small is None or self.small.shape[:2] != (size[1], size[0]):
+            self.small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        cv2.resize(frame, size, dst=self.small, interpolation=cv2.INTER_AREA)
+        small_keep = None
+        if keep is not None:
+            if self.small_keep is None or self.small_keep.shape != self.small.shape[:2]:
+                self.small_keep = np.empty(self.small.shape[:2], dtype=np.uint8)
+            small_keep = cv2.resize(keep, size, dst=self.small_keep, interpolation=cv2.INTER_NEAREST)
+        mask_white, mask_red = self.coarse.masks(self.small, small_keep)
+        white = extract_blobs(mask_white, MIN_CONTOUR_AREA / scale ** 2, MIN_RADIUS / scale, PYRAMID_COARSE_CIRCULARITY)
+        red = extract_blobs(mask_red, RED_MIN_CONTOUR_AREA / scale ** 2, RED_MIN_RADIUS / scale, PYRAMID_COARSE_CIRCULARITY)
+        return white * scale, red * scale
+
+    def confirm(self, frame, coarse, color, limit=None, keep=None):
+        height, width = frame.shape[:2]
+        side = min(height, width, (height // PYRAMID_WINDOW_DIVISOR) * 2)
+        confirmed = []
+        for x, y, _ in coarse:
+            x0 = int(np.clip(x - side // 2, 0, width - side))
+            y0 = int(np.clip(y - side // 2, 0, height - side))
+            window = frame[y0:y0 + side, x0:x0 + side]
+            mask_white, mask_red = self.window.masks(window, None if keep is None else keep[y0:y0 + side, x0:x0 + side])
+            if color == "white":
+                blobs = localize_blobs(window, mask_white, extract_blobs(mask_white, MIN_CONTOUR_AREA, MIN_RADIUS, MIN_CIRCULARITY))
+            else:
+                blobs = localize_blobs(window, mask_red, extract_blobs(mask_red, RED_MIN_CONTOUR_AREA, RED_MIN_RADIUS, RED_MIN_CIRCULARITY))
+            if not len(blobs):
+                continue
+            blobs[:, 0] += x0
+            blobs[:, 1] += y0
+            best = blobs[np.argmin(np.hypot(blobs[:, 0] - x, blobs[:, 1] - y))]
+            # Neighbouring windows can confirm the same ball
+            if any(np.hypot(best[0] - cx, best[1] - cy) < best[2] for cx, cy, _, _ in confirmed):
+                continue
+            confirmed.append(best)
+            if limit is not None and len(confirmed) >= limit:
+                break
+        return np.array(confirmed, dtype=np.float32).reshape(-1, 4)
+
+    def candidates(self, frame, keep=None):
+        width = frame.shape[1]
+        if width < PYRAMID_MIN_WIDTH:
+            return self.full.candidates(frame, keep)
+        scale = max(2, int(round(width / PYRAMID_COARSE_WIDTH)))
+        coarse_white, coarse_red = self.coarse_candidates(frame, scale, keep)
+        return (self.confirm(frame, coarse_white, "white", keep=keep),
+                self.confirm(frame, coarse_red, "red", limit=RED_BALL_LIMIT, keep=keep))
+
+class BackgroundDetector:
+    # Keeps an exponential running average of the empty playfield and finds balls as foreground against it.
+    # Regions around tracked balls are left out of the update so resting balls never fade into the background.
+    # Blobs are split into white and red by the hue of their centre patch instead of thresholding every pixel
+    def __init__(self, open_iterations=MASK_OPEN_ITERATIONS, filename=BACKGROUND_FILE):
+        self.open_iterations = open_iterations
+        self.filename = filename
+        self.shape = None
+        self.background = None
+        self.kernel = np.ones((3, 3), dtype=np.uint8)
+        self.last_save = time.time()
+        self.update_thresholds()
+        self.load()
+
+    def update_thresholds(self):
+        self.lower_red = np.array(BALL_COLOR_RANGE["lower_red"], dtype=np.uint8)
+        self.upper_red = np.array(BALL_COLOR_RANGE["upper_red"], dtype=np.uint8)
+
+    def allocate(self, shape):
+        height, width = shape[:2]
+        self.difference = np.empty((height, width, 3), dtype=np.uint8)
+        self.channels = [np.empty((height, width), dtype=np.uint8) for _ in range(3)]
+        self.foreground = np.empty((height, width), dtype=np.uint8)
+        self.no_red = np.zeros((height, width), dtype=np.uint8)
+        self.update_mask = np.empty((height, width), dtype=np.uint8)
+        self.background_image = np.empty((height, width, 3), dtype=np.uint8)
+        if self.background is None or self.background.shape != (height, width, 3):
+            self.background = None
+        else:
+            cv2.convertScaleAbs(self.background, dst=self.background_image)
+        self.shape = shape
+        print(f"Background detector buffers allocated for {width}x{height}")
+
+    def masks(self, frame, keep=None):
+        # The foreground is returned as the white mask; colours are only told apart per blob in candidates
+        if frame.shape != self.shape:
+            self.allocate(frame.shape)
+        if self.background is None:
+            self.background = frame.astype(np.float32)
+            cv2.convertScaleAbs(self.background, dst=self.background_image)
+            print("Background model started from the current frame")
+        cv2.absdiff(frame, self.background_image, dst=self.difference)
+        cv2.split(self.difference, self.channels)
+        cv2.max(self.channels[0], self.channels[1], dst=self.foreground)
+        cv2.max(self.foreground, self.channels[2], dst=self.foreground)
+        cv2.threshold(self.foreground, BACKGROUND_THRESHOLD, 255, cv2.THRESH_BINARY, dst=self.foreground)
+        if keep is not None:
+            cv2.bitwise_and(self.foreground, keep, dst=self.foreground)
+        cv2.morphologyEx(self.foreground, cv2.MORPH_OPEN, self.kernel, dst=self.foreground, iterations=self.open_iterations)
+        return self.foreground, self.no_red
+
+    def candidates(self, frame, keep=None):
+        foreground, _ = self.masks(frame, keep)
+        blobs = localize_blobs(frame, foreground, extract_blobs(foreground, MIN_CONTOUR_AREA, MIN_RADIUS, MIN_CIRCULARITY))
+        if not len(blobs):
+            return blobs, blobs
+        # Average a small patch at each centre and test it against the red range in one batch
+        half = np.maximum(blobs[:, 2] // 2, 1).astype(np.intp)
+        centers = np.round(blobs[:, :2]).astype(np.intp)
+        patches = [frame[max(y - h, 0):y + h + 1, max(x - h, 0):x + h + 1].reshape(-1, 3).mean(axis=0)
+                   for (x, y), h in zip(centers, half)]
+        hsv = cv2.cvtColor(np.array(patches, dtype=np.uint8).reshape(-1, 1, 3), cv2.COLOR_BGR2HSV)
+        is_red = cv2.inRange(hsv, self.lower_red, self.upper_red).ravel() > 0
+        red = blobs[is_red & (blobs[:, 2] > RED_MIN_RADIUS)][:RED_BALL_LIMIT]
+        return blobs[~is_red], red
+
+    def update_background(self, frame, balls):
+        if self.background is None or frame.shape != self.shape:
+            return
+        self.update_mask.fill(255)
+        for x, y, radius, *_ in balls:
+            cv2.circle(self.update_mask, (int(x), int(y)), int(radius) + BACKGROUND_TRACK_MARGIN, 0, -1)
+        cv2.accumulateWeighted(frame, self.background, BACKGROUND_LEARNING_RATE, mask=self.update_mask)
+        cv2.convertScaleAbs(self.background, dst=self.background_image)
+        if time.time() - self.last_save >= BACKGROUND_SAVE_INTERVAL:
+            self.last_save = time.time()
+            threading.Thread(target=self.save, args=(self.background_image.copy(),), daemon=True).start()
+
+    def save(self, background_image=None):
+        if background_image is None:
+            if self.background is None:
+                return
+            background_image = self.background_image
+        try:
+            np.savez_compressed(self.filename, background=background_image)
+            print(f"Background saved to {self.filename}")
+        except Exception as e:
+            print(f"Error saving background: {e}")
+
+    def load(self):
+        if not os.path.exists(self.filename):
+            return False
+        try:
+            self.background = np.load(self.filename)["background"].astype(np.float32)
+            print(f"Background loaded from {self.filename}")
+            return True
+        except Exception as e:
+            print(f"Error loading background: {e}")
+            return False
+
+def create_detector():
+    if DETECTION_BACKGROUND:
+        return BackgroundDetector()
+    if DETECTION_PYRAMID:
+        return PyramidDetector()
+    return BallDetector()
+
+def detect_and_track_balls(frame, tracker, detector, settled=None, keep=None):
+    white_candidates, red_candidates = detector.candidates(frame, keep)
+    if settled is not None:
+        settled.verify(frame, tracker)
+        white_candidates = settled.unclaimed(white_candidates)
+        red_candidates = settled.unclaimed(red_candidates)
 
     centroids = []
     balls = []
-    
-    for contour in contours_white:
-        area = cv2.contourArea(contour)
-        ((x, y), radius) = cv2.minEnclosingCircle(contour)
-        perimeter = cv2.arcLength(contour, True)
-        circularity = (4 * np.pi * area) / (perimeter ** 2) if perimeter > 0 else 0
-        if area > MIN_CONTOUR_AREA and radius > MIN_RADIUS and circularity > 0.6:
-            centroids.append((int(x), int(y)))
-            balls.append((int(x), int(y), int(radius), "white"))
-
-    red_balls_count = 0
-    for contour in contours_red:
-        if red_balls_count >= RED_BALL_LIMIT:
-            break
-        area = cv2.contourArea(contour)
-        ((x, y), radius) = cv2.minEnclosingCircle(contour)
-        perimeter = cv2.arcLength(contour, True)
-        circularity = (4 * np.pi * area) / (perimeter ** 2) if perimeter > 0 else 0
-        if area > RED_MIN_CONTOUR_AREA and radius > RED_MIN_RADIUS and circularity > RED_MIN_CIRCULARITY:
-            centroids.append((int(x), int(y)))
-            balls.append((int(x), int(y), int(radius), "red"))
-            red_balls_count += 1
+    for candidates, color in ((white_candidates, "white"), (red_candidates, "red")):
+        for x, y, radius, confidence in candidates:
+            centroids.append((float(x), float(y)))
+            balls.append((float(x), float(y), int(radius), color, float(confidence)))
 
     tracked_objects = tracker.update(centroids)
     tracked_balls = []
     for obj_id, (x, y) in tracked_objects.items():
-        for ball_x, ball_y, radius, color in balls:
+        if tracker.disappeared[obj_id]:
+            continue  # Objects that were not matched this frame keep an old or predicted position
+        for ball_x, ball_y, radius, color, confidence in balls:
             if abs(ball_x - x) < 10 and abs(ball_y - y) < 10:
-                tracked_balls.append((ball_x, ball_y, radius, obj_id, color))
+                tracked_balls.append((ball_x, ball_y, radius, obj_id, color, confidence))
                 break
     return tracked_balls
 
-def calculate_score(balls, point_zones, special_hole, power_up_zone, last_red_score_time, red_score_cooldown, power_up):
-    global scored_ball_ids, current_score
+class HoleOccupancy:
+    # Per-hole state machine (empty -> candidate -> occupied -> scored -> cleared) kept as arrays over all holes.
+    # Holes are the point zones in order, followed by the special hole if there is one
+    def __init__(self):
+        self.zones = None
+        self.set_zones([], None)
+
+    def set_zones(self, point_zones, special_hole):
+        zones = list(point_zones) + ([special_hole] if special_hole else [])
+        if zones == self.zones:
+            return
+        count_changed = self.zones is None or len(zones) != len(self.zones)
+        self.zones = zones
+        self.centers = np.array([(x, y) for x, y, _, _ in zones], dtype=np.float32).reshape(-1, 2)
+        self.radii = np.array([r for _, _, r, _ in zones], dtype=np.float32)
+        if count_changed:
+            self.reset()
+
+    def reset(self):
+        count = len(self.zones)
+        self.state = np.full(count, HOLE_EMPTY, dtype=np.int8)
+        self.present_frames = np.zeros(count, dtype=np.int32)
+        self.absent_frames = np.zeros(count, dtype=np.int32)
+        self.changed_at = np.zeros(count, dtype=np.float64)
+
+    def update(self, balls, now):
+        if not len(self.zones):
+            return
+        if balls:
+            positions = np.array([(ball[0], ball[1]) for ball in balls], dtype=np.float32)
+            distances = np.linalg.norm(self.centers[:, None, :] - positions[None, :, :], axis=2)
+            present = (distances <= self.radii[:, None]).any(axis=1)
+        else:
+            present = np.zeros(len(self.zones), dtype=bool)
+        self.present_frames = np.where(present, self.present_frames + 1, 0)
+        self.absent_frames = np.where(present, 0, self.absent_frames + 1)
+        held = now - self.changed_at
+
+        state = self.state
+        new_state = state.copy()
+        new_state[(state == HOLE_EMPTY) & present] = HOLE_CANDIDATE
+        new_state[(state == HOLE_CANDIDATE) & ~present] = HOLE_EMPTY
+        new_state[(state == HOLE_CANDIDATE) & present & (self.present_frames >= OCCUPANCY_ENTER_FRAMES)
+                  & (held >= OCCUPANCY_ENTER_TIME)] = HOLE_OCCUPIED
+        new_state[(state == HOLE_OCCUPIED) & ~present] = HOLE_EMPTY
+        new_state[(state == HOLE_SCORED) & ~present] = HOLE_CLEARED
+        new_state[(state == HOLE_CLEARED) & present] = HOLE_SCORED
+        new_state[(state == HOLE_CLEARED) & (self.absent_frames >= OCCUPANCY_EXIT_FRAMES)
+                  & (held >= OCCUPANCY_EXIT_TIME)] = HOLE_EMPTY
+        self.changed_at = np.where(new_state != state, now, self.changed_at)
+        self.state = new_state
+
+    def hole_at(self, x, y):
+        # Index of the first hole whose circle contains (x, y), or None
+        inside = np.flatnonzero(np.hypot(self.centers[:, 0] - x, self.centers[:, 1] - y) <= self.radii)
+        return int(inside[0]) if len(inside) else None
+
+    def is_ready(self, hole_index):
+        return self.state[hole_index] == HOLE_OCCUPIED
+
+    def mark_scored(self, hole_index):
+        self.state[hole_index] = HOLE_SCORED
+
+class SettledBallRegistry:
+    # Scored balls that come to rest in a hole stay there for the rest of the game. Once one has been still for
+    # SETTLE_FRAMES inside a hole it is taken out of the tracker, its detections are claimed here, and it is only
+    # re-checked every SETTLE_CHECK_INTERVAL frames by comparing the pixels around it with a stored patch
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.settled = OrderedDict()  # ball_id -> (x, y, radius, color, confidence, box, patch)
+        self.still = {}  # ball_id -> [anchor_x, anchor_y, frames]
+        self.frames_since_check = 0
+
+    def __len__(self):
+        return len(self.settled)
+
+    def balls(self):
+        return [(x, y, radius, ball_id, color, confidence)
+                for ball_id, (x, y, radius, color, confidence, _, _) in self.settled.items()]
+
+    def observe(self, balls, occupancy, frame, tracker):
+        # Count how long each scored ball has stayed put and freeze the ones resting inside a hole
+        seen = set()
+        for x, y, radius, ball_id, color, confidence in balls:
+            seen.add(ball_id)
+            still = self.still.get(ball_id)
+            if still is None or np.hypot(x - still[0], y - still[1]) > SETTLE_MOVE_TOLERANCE:
+                self.still[ball_id] = [x, y, 1]
+                continue
+            still[2] += 1
+            if still[2] < SETTLE_FRAMES or not ball_ids.is_scored(ball_id) or not len(occupancy.radii):
+                continue
+            if not (np.linalg.norm(occupancy.centers - (x, y), axis=1) <= occupancy.radii).any():
+                continue
+            box = self.patch_box(x, y, radius, frame.shape)
+            if box is None:
+                continue
+            x0, y0, x1, y1 = box
+            self.settled[ball_id] = (x, y, radius, color, confidence, box, frame[y0:y1, x0:x1].copy())
+            del self.still[ball_id]
+            if ball_id in tracker.objects:
+                tracker.deregister(ball_id, release=False)  # The ID stays allocated while the ball is settled
+            print(f"Ball {ball_id} settled at ({x:.0f}, {y:.0f})")
+        for ball_id in list(self.still):
+            if ball_id not in seen:
+                del self.still[ball_id]
+
+    def patch_box(self, x, y, radius, frame_shape):
+        half = int(radius) + 2
+        x0, y0 = max(0, int(x) - half), max(0, int(y) - half)
+        x1, y1 = min(frame_shape[1], int(x) + half + 1), min(frame_shape[0], int(y) + half + 1)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+
+    def verify(self, frame, tracker):
+        # Release any settled ball whose patch no longer matches; if it is still there the tracker picks it up again
+        if not self.settled:
+            return
+        self.frames_since_check += 1
+        if self.frames_since_check < SETTLE_CHECK_INTERVAL:
+            return
+        self.frames_since_check = 0
+        for ball_id, (x, y, _, _, _, box, patch) in list(self.settled.items()):
+            x0, y0, x1, y1 = box
+            current = frame[y0:y1, x0:x1]
+            if current.shape != patch.shape or cv2.norm(current, patch, cv2.NORM_L1) / patch.size > SETTLE_PATCH_DIFF:
+                del self.settled[ball_id]
+                tracker.restore(ball_id, (x, y))
+                print(f"Settled ball {ball_id} released")
+
+    def unclaimed(self, candidates):
+        # Drop detections that belong to a settled ball so they never reach the tracker
+        if not self.settled or not len(candidates):
+            return candidates
+        settled = np.array([(x, y, radius) for x, y, radius, _, _, _, _ in self.settled.values()], dtype=np.float32)
+        distances = np.linalg.norm(candidates[:, None, :2] - settled[None, :, :2], axis=2)
+        return candidates[~(distances <= settled[None, :, 2]).any(axis=1)]
+
+def calculate_score(balls, point_zones, special_hole, power_up_zone, last_red_score_time, red_score_cooldown, power_up, occupancy=None, now=None,
+                    score_log=None):
+    global current_score
     round_score = 0
     scored_positions = []
     special_hole_triggered = False
     power_up_activated = False
     power_up_type = None
-    current_time = time.time()
+    current_time = time.monotonic() if now is None else now
+    round_events = []
 
-    for ball_x, ball_y, _, ball_id, color in balls:
-        if ball_id not in scored_ball_ids:
+    for ball_x, ball_y, _, ball_id, color, confidence in balls:
+        if not ball_ids.is_scored(ball_id) and confidence >= SCORE_MIN_CONFIDENCE:
             if power_up_zone and power_up_zone.is_active():
                 zone_x, zone_y, zone_radius = power_up_zone.x, power_up_zone.y, power_up_zone.radius
                 distance = np.sqrt((ball_x - zone_x)**2 + (ball_y - zone_y)**2)
                 if distance <= zone_radius:
-                    scored_ball_ids.add(ball_id)
+                    # The zone sits on a point hole, so the ball has to settle in that hole like any other score
+                    if occupancy:
+                        hole_index = occupancy.hole_at(ball_x, ball_y)
+                        if hole_index is None or not occupancy.is_ready(hole_index):
+                            continue
+                        occupancy.mark_scored(hole_index)
+                    ball_ids.mark_scored(ball_id)
                     scored_positions.append((ball_x, ball_y))
                     power_up_activated = True
                     power_up_type = random.choice(POWER_UP_TYPES)
                     power_up_zone.deactivate()
+                    round_events.append((EVENT_POWER_UP_ZONE, 0, -1, POWER_UP_TYPES.index(power_up_type), 0, ball_x, ball_y))
                     continue
 
             if special_hole:
                 special_x, special_y, special_radius, special_points = special_hole
                 distance = np.sqrt((ball_x - special_x)**2 + (ball_y - special_y)**2)
                 if distance <= special_radius:
+                    if occupancy:
+                        if not occupancy.is_ready(len(point_zones)):
+                            continue
+                        occupancy.mark_scored(len(point_zones))
+                    if not special_hole_triggered:
+                        # Doubling applies to the score before this round, so it is logged ahead of the round's points
+                        round_events.insert(0, (EVENT_SPECIAL, 0, -1, 0, 0, ball_x, ball_y))
                     special_hole_triggered = True
-                    scored_ball_ids.add(ball_id)
+                    ball_ids.mark_scored(ball_id)
                     scored_positions.append((ball_x, ball_y))
                     continue
 
-            for zone_x, zone_y, zone_radius, points in point_zones:
+            for zone_index, (zone_x, zone_y, zone_radius, points) in enumerate(point_zones):
                 distance = np.sqrt((ball_x - zone_x)**2 + (ball_y - zone_y)**2)
                 if distance <= zone_radius:
+                    if occupancy:
+                        if not occupancy.is_ready(zone_index):
+                            break
+                        occupancy.mark_scored(zone_index)
                     base_points = points
+                    flags = EVENT_FLAG_RED if color == "red" else 0
                     if color == "red" and (current_time - last_red_score_time >= red_score_cooldown):
                         base_points *= 2
                         last_red_score_time = current_time
+                        flags |= EVENT_FLAG_DOUBLED
                     if power_up and power_up.is_active() and power_up.power_up_type == "Score Multiplier":
                         base_points *= POWER_UP_MULTIPLIER
                         power_up.deactivate()
+                        flags |= EVENT_FLAG_MULTIPLIED
                     round_score += base_points
-                    scored_ball_ids.add(ball_id)
+                    round_events.append((EVENT_ZONE, flags, zone_index, 0, points, ball_x, ball_y))
+                    ball_ids.mark_scored(ball_id)
                     scored_positions.append((ball_x, ball_y))
                     break
 
     if special_hole_triggered:
         current_score *= 2
+    if score_log:
+        for kind, flags, zone, detail, points, x, y in round_events:
+            score_log.record(kind, current_time, flags=flags, zone=zone, detail=detail, points=points, x=x, y=y)
 
     return round_score, last_red_score_time, scored_positions, power_up_activated, power_up_type
 
+class ScoreLog:
+    # Append-only log of scoring events, one SCORE_EVENT_DTYPE record each, behind an 8-byte magic header. Games
+    # are numbered on from the last game in the file and times are seconds since the game started. Records are
+    # flushed as they are written, so a crash loses at most the round being written
+    def __init__(self, filename=SCORE_EVENTS_FILE):
+        self.game = 0
+        self.playing = False
+        self.start_time = 0.0
+        last = load_score_events(filename)[-1:] if os.path.exists(filename) else []
+        if len(last):
+            self.game = int(last["game"][0]) + 1
+        self.file = open(filename, "ab")
+        if self.file.tell() == 0:
+            self.file.write(SCORE_EVENTS_MAGIC)
+
+    def record(self, kind, now, flags=0, zone=-1, detail=0, points=0, x=0, y=0):
+        if not self.playing:
+            return
+        record = np.array([(self.game, now - self.start_time, kind, flags, zone, detail, points,
+                            min(max(int(x), 0), 65535), min(max(int(y), 0), 65535))], dtype=SCORE_EVENT_DTYPE)
+        self.file.write(record.tobytes())
+        self.file.flush()
+
+    def start_game(self, now, timed=False):
+        if self.playing:
+            return
+        self.playing = True
+        self.start_time = now
+        self.record(EVENT_GAME_START, now, detail=int(timed))
+
+    def end_game(self, now, total):
+        if not self.playing:
+            return
+        self.record(EVENT_GAME_END, now, points=total)
+        self.playing = False
+        self.game += 1
+
+    def close(self):
+        self.file.close()
+
+def open_score_log():
+    if not SCORE_LOG_ENABLED:
+        return None
+    try:
+        return ScoreLog()
+    except (OSError, ValueError) as e:
+        print(f"Error opening score event log: {e}")
+        return None
+
+def load_score_events(filename=SCORE_EVENTS_FILE):
+    with open(filename, "rb") as f:
+        if f.read(len(SCORE_EVENTS_MAGIC)) != SCORE_EVENTS_MAGIC:
+            raise ValueError(f"{filename} is not a score event log")
+        data = f.read()
+    # A record cut short by a crash is dropped
+    return np.frombuffer(data[:len(data) - len(data) % SCORE_EVENT_DTYPE.itemsize], dtype=SCORE_EVENT_DTYPE)
+
+def default_score_rules():
+    return {
+        "zone_points": {},  # Recorded hole value -> new value; holes not listed keep their value
+        "red_multiplier": 2,
+        "red_cooldown": RED_BALL_COOLDOWN,
+        "power_up_multiplier": POWER_UP_MULTIPLIER,
+        "special_multiplier": 2,
+    }
+
+def replay_scores(events, rules=None):
+    # Recomputes the final score of every game in an event log under a rule set, for all games at once. Returns
+    # the game numbers and their scores. Zone values and multipliers are plain array operations; the red-ball
+    # cooldown depends on the previous doubled red ball, so it steps through each game's red balls in lock-step
+    # across games. A special hole doubles everything scored before it in the same game
+    rules = {**default_score_rules(), **(rules or {})}
+    if not len(events):
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int64)
+    events = events[np.argsort(events["game"], kind="stable")]
+    games, game_index = np.unique(events["game"], return_inverse=True)
+    zone = events["kind"] == EVENT_ZONE
+    points = np.where(zone, events["points"], 0).astype(np.int64)
+    if rules["zone_points"]:
+        old_values = np.array(sorted(rules["zone_points"]), dtype=np.int64)
+        new_values = np.array([rules["zone_points"][value] for value in old_values], dtype=np.int64)
+        changed = zone & np.isin(points, old_values)
+        points[changed] = new_values[np.searchsorted(old_values, points[changed])]
+
+    red_rows = np.flatnonzero(zone & (events["flags"] & EVENT_FLAG_RED > 0))
+    if len(red_rows):
+        red_games = game_index[red_rows]
+        first = np.searchsorted(red_games, red_games)
+        rank = np.arange(len(red_rows)) - first
+        last_double = np.full(len(games), -np.inf)
+        times = events["time"][red_rows].astype(np.float64)
+        doubled = np.zeros(len(red_rows), dtype=bool)
+        by_rank = np.argsort(rank, kind="stable")
+        for step in np.split(by_rank, np.flatnonzero(np.diff(rank[by_rank])) + 1):
+            ready = times[step] - last_double[red_games[step]] >= rules["red_cooldown"]
+            doubled[step] = ready
+            last_double[red_games[step][ready]] = times[step][ready]
+        points[red_rows[doubled]] *= rules["red_multiplier"]
+
+    multiplied = zone & (events["flags"] & EVENT_FLAG_MULTIPLIED > 0)
+    points[multiplied] *= rules["power_up_multiplier"]
+
+    specials = np.cumsum(events["kind"] == EVENT_SPECIAL)
+    game_end = np.r_[np.flatnonzero(np.diff(game_index)), len(events) - 1]
+    specials_after = specials[game_end][game_index] - specials
+    points *= np.power(np.int64(rules["special_multiplier"]), specials_after)
+    scores = np.zeros(len(games), dtype=np.int64)
+    np.add.at(scores, game_index, points)
+    return games, scores
+
+def recorded_scores(events):
+    # Final scores as recorded at the end of each finished game
+    ends = events[events["kind"] == EVENT_GAME_END]
+    return ends["game"], ends["points"].astype(np.int64)
+
+class ParticleSystem:
+    # Fixed-capacity structure of arrays. Live particles are advanced and rasterized in one vectorized pass, so the
+    # per-frame cost is bounded by the pool size and an empty pool costs nothing. Positions are in display image pixels
+    def __init__(self, capacity=PARTICLE_CAPACITY):
+        self.capacity = capacity
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.float32)
+        self.born = np.zeros(capacity, dtype=np.float64)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        radius = int(np.ceil(PARTICLE_MAX_SIZE))
+        offset_y, offset_x = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+        disc = np.hypot(offset_x, offset_y) <= PARTICLE_MAX_SIZE
+        self.offsets = np.stack([offset_x[disc], offset_y[disc]], axis=1).astype(np.int32)
+        self.offset_distance = np.hypot(offset_x, offset_y)[disc].astype(np.float32)
+
+    def spawn(self, x, y, count=PARTICLE_COUNT, now=None):
+        now = time.time() * 1000 if now is None else now
+        # Free slots first, then the oldest live particles
+        slots = np.argsort(np.where(self.alive, self.born, -np.inf), kind="stable")[:count]
+        self.position[slots] = (x, y)
+        self.velocity[slots] = np.random.uniform(-PARTICLE_MAX_SPEED, PARTICLE_MAX_SPEED, (len(slots), 2))
+        self.size[slots] = np.random.uniform(2, PARTICLE_MAX_SIZE, len(slots))
+        self.born[slots] = now
+        self.color[slots] = PARTICLE_COLORS[np.random.randint(len(PARTICLE_COLORS), size=len(slots))]
+        self.alive[slots] = True
+
+    def update(self, now=None):
+        now = time.time() * 1000 if now is None else now
+        self.alive &= (now - self.born) <= PARTICLE_LIFETIME
+        self.position += self.velocity * self.alive[:, None]
+
+    def draw(self, image, now=None):
+        # Particles shrink and fade over their lifetime, blended into image in place. Each live particle stamps the
+        # pixels of the precomputed disc that are within its current size and on the image
+        live = np.flatnonzero(self.alive)
+        if not len(live):
+            return
+        now = time.time() * 1000 if now is None else now
+        fade = np.clip(1.0 - (now - self.born[live]) / PARTICLE_LIFETIME, 0.0, 1.0)
+        height, width = image.shape[:2]
+        centers = np.round(self.position[live]).astype(np.intp)
+        xs = centers[:, 0, None] + self.offsets[None, :, 0]
+        ys = centers[:, 1, None] + self.offsets[None, :, 1]
+        stamped = ((self.offset_distance[None, :] <= (self.size[live] * fade)[:, None])
+                   & (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height))
+        particle, offset = np.nonzero(stamped)
+        if not len(particle):
+            return
+        index = (ys[particle, offset] * width + xs[particle, offset])[:, None] * 3 + np.arange(3)
+        # Opacity in 1/256 steps, so the blend fits in 16-bit integers
+        alpha = (fade * 256).astype(np.uint16)[particle, None]
+        data = image.reshape(-1)
+        pixels = data.take(index).astype(np.uint16)
+        pixels *= 256 - alpha
+        pixels += self.color[live[particle]] * alpha
+        pixels >>= 8
+        data.put(index, pixels)
+
+class GameClock:
+    # Game time in seconds on the monotonic clock. It stands still while paused, so power-ups, zones and the
+    # timed-mode countdown do not run down behind a menu
+    def __init__(self, source=time.monotonic):
+        self.source = source
+        self.origin = source()
+        self.paused_at = None
+
+    def now(self):
+        return (self.source() if self.paused_at is None else self.paused_at) - self.origin
+
+    def pause(self):
+        if self.paused_at is None:
+            self.paused_at = self.source()
+
+    def resume(self):
+        if self.paused_at is not None:
+            self.origin += self.source() - self.paused_at
+            self.paused_at = None
+
+class SimulatedClock(GameClock):
+    # Game clock that only moves when advanced, for replays and tests
+    def __init__(self, start=0.0):
+        self.time = start
+        super().__init__(lambda: self.time)
+
+    def advance(self, seconds):
+        self.time += seconds
+
+class TimerScheduler:
+    # Every expiration in the game (power-up and zone lifetimes, the timed-mode countdown) is a deadline on the
+    # game clock in one heap. poll() pops only the timers that are due, so a frame with nothing expiring costs a
+    # single comparison. Cancelled and extended timers leave stale heap entries that are skipped when popped
+    def __init__(self, clock):
+        self.clock = clock
+        self.heap = []
+        self.pending = {}  # Timer id -> (deadline, callback)
+        self.next_id = 0
+
+    def schedule(self, delay, callback):
+        timer_id = self.next_id
+        self.next_id += 1
+        deadline = self.clock.now() + delay
+        self.pending[timer_id] = (deadline, callback)
+        heapq.heappush(self.heap, (deadline, timer_id))
+        return timer_id
+
+    def extend(self, timer_id, seconds):
+        if timer_id in self.pending:
+            deadline, callback = self.pending[timer_id]
+            self.pending[timer_id] = (deadline + seconds, callback)
+            heapq.heappush(self.heap, (deadline + seconds, timer_id))
+
+    def cancel(self, timer_id):
+        self.pending.pop(timer_id, None)
+
+    def is_pending(self, timer_id):
+        return timer_id in self.pending
+
+    def remaining(self, timer_id):
+        if timer_id not in self.pending:
+            return 0
+        return max(0.0, self.pending[timer_id][0] - self.clock.now())
+
+    def poll(self):
+        now = self.clock.now()
+        while self.heap and self.heap[0][0] <= now:
+            deadline, timer_id = heapq.heappop(self.heap)
+            entry = self.pending.get(timer_id)
+            if entry and entry[0] == deadline:
+                del self.pending[timer_id]
+                entry[1]()
+
+    def clear(self):
+        self.heap.clear()
+        self.pending.clear()
+
 class PowerUpZone:
-    def __init__(self, x, y, radius, duration):
+    def __init__(self, x, y, radius, duration, timers):
         self.x = x
         self.y = y
         self.radius = radius
         self.duration = duration
-        self.start_time = time.time()
+        self.timers = timers
+        self.timer = timers.schedule(duration, self.deactivate)
         self.active = True
 
     def is_active(self):
-        if not self.active or (time.time() - self.start_time) > self.duration:
-            self.active = False
         return self.active
 
     def deactivate(self):
         self.active = False
+        self.timers.cancel(self.timer)
 
     def get_remaining_time(self):
         if not self.active:
             return 0
-        elapsed = time.time() - self.start_time
-        return max(0, self.duration - elapsed)
+        return self.timers.remaining(self.timer)
 
 class PowerUp:
     def __init__(self, power_up_type, duration=None):
         self.power_up_type = power_up_type
         self.duration = duration if duration else (None if power_up_type in ["Score Multiplier", "Double Balls"] else POWER_UP_DURATION)
-        self.start_time = None
+        self.timers = None
+        self.timer = None
         self.active = False
 
-    def activate(self):
-        self.start_time = time.time()
+    def activate(self, timers):
+        self.timers = timers
+        if self.duration is not None:
+            self.timer = timers.schedule(self.duration, self.deactivate)
         self.active = True
 
     def deactivate(self):
         self.active = False
+        if self.timer is not None:
+            self.timers.cancel(self.timer)
 
     def is_active(self):
-        if not self.active:
-            return False
-        if self.duration is None:
-            return True
-        elapsed = time.time() - self.start_time
-        if elapsed > self.duration:
-            self.deactivate()
-            return False
-        return True
+        return self.active
 
     def get_remaining_time(self):
         if self.duration is None:
             return None
         if not self.active:
             return 0
-        elapsed = time.time() - self.start_time
-        return max(0, self.duration - elapsed)
+        return self.timers.remaining(self.timer)
+
+class FrameScheduler:
+    # Display and detection deadlines on the monotonic clock. A task that runs late moves its next deadline forward
+    # from now instead of bunching up, and a slow task never changes the other one's rate
+    def __init__(self, render_fps=RENDER_FPS, detection_fps=DETECTION_FPS):
+        self.render_interval = 1.0 / render_fps
+        self.detection_interval = 1.0 / detection_fps
+        self.reset()
+
+    def reset(self):
+        now = time.monotonic()
+        self.next_render = now
+        self.next_detection = now
+
+    def set_render_rate(self, fps):
+        self.render_interval = 1.0 / fps
+
+    def advance(self, deadline, interval, now):
+        deadline += interval
+        return deadline if deadline > now else now + interval
+
+    def render_due(self, now):
+        if now < self.next_render:
+            return False
+        self.next_render = self.advance(self.next_render, self.render_interval, now)
+        return True
+
+    def detection_due(self, now):
+        if now < self.next_detection:
+            return False
+        self.next_detection = self.advance(self.next_detection, self.detection_interval, now)
+        return True
+
+    def delay_ms(self, now):
+        return max(1, int((min(self.next_render, self.next_detection) - now) * 1000))
+
+class PygameRenderer:
+    # Draws the playfield, overlays and HUD with pygame; Tk stays in charge of menus and dialogs. The scaled camera
+    # image is written into one RGB array that a pygame surface wraps directly, so no PIL image or copy is made,
+    # and rings and text are cached as surfaces
+    def __init__(self, fullscreen=PYGAME_FULLSCREEN):
+        pygame.display.init()
+        pygame.font.init()
+        if fullscreen:
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            self.screen = pygame.display.set_mode(PYGAME_WINDOW_SIZE)
+        pygame.display.set_caption("Whiffle Ball Game")
+        self.font = pygame.font.SysFont("Helvetica", 28)
+        self.small_font = pygame.font.SysFont("Helvetica", 14)
+        self.frame_shape = None
+        self.scaled = None
+        self.rgb = None
+        self.frame_surface = None
+        self.rings = {}
+        self.texts = {}
+
+    def layout(self, frame_shape):
+        # Size and offset of the camera image when fitted to the screen
+        screen_width, screen_height = self.screen.get_size()
+        scale = min(screen_width / frame_shape[1], screen_height / frame_shape[0])
+        width, height = int(frame_shape[1] * scale), int(frame_shape[0] * scale)
+        return width, height, (screen_width - width) // 2, (screen_height - height) // 2
+
+    def screen_to_frame(self, x, y):
+        if self.frame_shape is None:
+            return x, y
+        width, height, offset_x, offset_y = self.layout(self.frame_shape)
+        return int((x - offset_x) * self.frame_shape[1] / width), int((y - offset_y) * self.frame_shape[0] / height)
+
+    def ring(self, radius, color, width=2):
+        key = (radius, color, width)
+        if key not in self.rings:
+            surface = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(surface, color, (radius, radius), radius, width)
+            self.rings[key] = surface
+        return self.rings[key]
+
+    def text(self, text, color, small=False):
+        key = (text, color, small)
+        if key not in self.texts:
+            if len(self.texts) >= PYGAME_TEXT_CACHE_SIZE:
+                self.texts.clear()
+            self.texts[key] = (self.small_font if small else self.font).render(text, True, color)
+        return self.texts[key]
+
+    def blit_centered(self, surface, x, y):
+        self.screen.blit(surface, (x - surface.get_width() // 2, y - surface.get_height() // 2))
+
+    def render(self, game):
+        frame = game.frame
+        width, height, offset_x, offset_y = self.layout(frame.shape)
+        if self.rgb is None or self.rgb.shape[:2] != (height, width):
+            self.scaled = np.empty((height, width, 3), dtype=np.uint8)
+            self.rgb = np.empty((height, width, 3), dtype=np.uint8)
+            self.frame_surface = pygame.image.frombuffer(self.rgb, (width, height), "RGB")
+        self.frame_shape = frame.shape
+        cv2.resize(frame, (width, height), dst=self.scaled, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self.scaled, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        if game.editing_mask and game.exclusion.is_enabled():
+            excluded = cv2.resize(game.exclusion.fit(frame.shape), (width, height), interpolation=cv2.INTER_NEAREST) == 0
+            self.rgb[excluded] = self.rgb[excluded] // 2 + np.uint8([127, 0, 0])
+        game.particles.update()
+        game.particles.draw(self.rgb)
+
+        self.screen.fill((0, 0, 0))
+        self.screen.blit(self.frame_surface, (offset_x, offset_y))
+        scale = width / frame.shape[1]
+
+        def to_screen(x, y, r):
+            return int(x * scale + offset_x), int(y * scale + offset_y), max(int(r * scale), 1)
+
+        for x, y, r, points in game.point_zones:
+            x, y, r = to_screen(x, y, r)
+            self.blit_centered(self.ring(r, "red"), x, y)
+            self.blit_centered(self.text(str(points), "white", small=True), x, y)
+        if game.special_hole:
+            x, y, r = to_screen(*game.special_hole[:3])
+            self.blit_centered(self.ring(r, "purple"), x, y)
+            self.blit_centered(self.text("Double!", "purple", small=True), x, y)
+        if game.power_up_zone and game.power_up_zone.is_active():
+            x, y, r = to_screen(game.power_up_zone.x, game.power_up_zone.y, game.power_up_zone.radius)
+            self.blit_centered(self.ring(r, "green"), x, y)
+            self.blit_centered(self.text("Power-Up", "green", small=True), x, y)
+        for ball_x, ball_y, ball_r, ball_id, color, _ in game.display_balls:
+            x, y, r = to_screen(ball_x, ball_y, ball_r)
+            self.blit_centered(self.ring(r, "red" if color == "red" else "green"), x, y)
+            self.blit_centered(self.text(f"ID: {ball_id} ({color})", "yellow", small=True), x, y - r - 10)
+
+        hud_y = 10
+        for label in (game.score_label, game.balls_label, game.timer_label, game.power_up_label):
+            surface = self.text(label.cget("text"), "white")
+            self.screen.blit(surface, (10, hud_y))
+            hud_y += surface.get_height() + 4
+
+        if time.time() < game.flash_until:
+            border = "yellow"
+        elif game.power_up and game.power_up.is_active():
+            border = BORDER_COLORS.get(game.power_up.power_up_type, "#2196F3")
+        else:
+            border = "#2196F3"
+        pygame.draw.rect(self.screen, border, (offset_x, offset_y, width, height), 3)
+        pygame.display.flip()
+
+    def handle_events(self, game):
+        # Clicks and drags go through the same handlers as the Tk canvas; keys through handle_input
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                game.handle_input(ord('q'))
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    pygame.display.toggle_fullscreen()
+                else:
+                    game.handle_input(event.key)
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                shift = 0x1 if pygame.key.get_mods() & pygame.KMOD_SHIFT else 0
+                game.canvas_click(types.SimpleNamespace(x=event.pos[0], y=event.pos[1], state=shift))
+            elif event.type == pygame.MOUSEMOTION and event.buttons[0]:
+                shift = 0x1 if pygame.key.get_mods() & pygame.KMOD_SHIFT else 0
+                game.canvas_drag(types.SimpleNamespace(x=event.pos[0], y=event.pos[1], state=shift))
+
+    def close(self):
+        pygame.display.quit()
+
+class SpectatorRequestHandler(http.server.BaseHTTPRequestHandler):
+    # One thread per viewer. "/" is a page showing the stream and score, "/stream.mjpg" is the MJPEG stream and
+    # "/events" is a server-sent event stream of game events
+    def do_GET(self):
+        spectator = self.server.spectator
+        try:
+            if self.path == "/":
+                page = SPECTATOR_PAGE.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+            elif self.path == "/stream.mjpg":
+                self.send_stream(spectator)
+            elif self.path == "/events":
+                self.send_events(spectator)
+            else:
+                self.send_error(404)
+        except OSError:
+            pass  # Viewer disconnected
+
+    def send_stream(self, spectator):
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        sequence = 0
+        while True:
+            jpeg, sequence = spectator.wait_frame(sequence)
+            if jpeg is None:
+                return
+            self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpeg))
+            self.wfile.write(jpeg)
+            self.wfile.write(b"\r\n")
+
+    def send_events(self, spectator):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        queue = spectator.subscribe()
+        try:
+            while True:
+                events = spectator.wait_events(queue)
+                if events is None:
+                    return
+                if events:
+                    self.wfile.write("".join(f"data: {event}\n\n" for event in events).encode())
+                else:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        finally:
+            spectator.unsubscribe(queue)
+
+    def log_message(self, format, *args):
+        pass
+
+class SpectatorServer:
+    # Local HTTP server for spectators. The game hands over its newest frame and returns at once; a single encoder
+    # thread annotates and JPEG-encodes it, and every viewer is sent that same buffer. A viewer that falls behind
+    # skips to the newest frame, so no connection can hold back the game loop
+    def __init__(self, port=SPECTATOR_PORT, fps=SPECTATOR_FPS, width=SPECTATOR_WIDTH, quality=SPECTATOR_JPEG_QUALITY):
+        self.interval = 1.0 / fps
+        self.width = width
+        self.quality = quality
+        self.condition = threading.Condition()
+        self.pending = None
+        self.jpeg = None
+        self.sequence = 0
+        self.last_publish = 0.0
+        self.score = 0
+        self.queues = []
+        self.running = True
+        self.httpd = http.server.ThreadingHTTPServer(("", port), SpectatorRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.spectator = self
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        threading.Thread(target=self.encode_loop, daemon=True).start()
+        print(f"Spectator stream on http://{socket.gethostname()}:{port}/")
+
+    def publish_frame(self, frame, point_zones, special_hole, balls, score):
+        # Called every detection tick; frames beyond SPECTATOR_FPS are dropped here, before any work is done
+        now = time.monotonic()
+        if now - self.last_publish < self.interval:
+            return
+        self.last_publish = now
+        with self.condition:
+            self.pending = (frame, list(point_zones), special_hole, list(balls), score)
+            self.condition.notify_all()
+
+    def publish_event(self, event_type, **fields):
+        if "total" in fields:
+            self.score = fields["total"]
+        event = json.dumps({"type": event_type, **fields})
+        with self.condition:
+            for queue in self.queues:
+                queue.append(event)
+            self.condition.notify_all()
+
+    def annotate(self, frame, point_zones, special_hole, balls, score):
+        scale = min(1.0, self.width / frame.shape[1])
+        if scale < 1.0:
+            frame = cv2.resize(frame, (self.width, int(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+        for x, y, r, points in point_zones:
+            center = (int(x * scale), int(y * scale))
+            cv2.circle(frame, center, max(1, int(r * scale)), (0, 0, 255), 2)
+            cv2.putText(frame, str(points), (center[0] - 8, center[1] + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        if special_hole:
+            x, y, r, _ = special_hole
+            cv2.circle(frame, (int(x * scale), int(y * scale)), max(1, int(r * scale)), (128, 0, 128), 2)
+        for x, y, r, _, color, _ in balls:
+            outline = (0, 0, 255) if color == "red" else (0, 255, 0)
+            cv2.circle(frame, (int(x * scale), int(y * scale)), max(1, int(r * scale)), outline, 2)
+        cv2.putText(frame, f"Score: {score}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 4)
+        cv2.putText(frame, f"Score: {score}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        return frame
+
+    def encode_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None or not self.running)
+                if not self.running:
+                    return
+                pending, self.pending = self.pending, None
+            ok, buffer = cv2.imencode(".jpg", self.annotate(*pending), [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if ok:
+                with self.condition:
+                    self.jpeg = buffer.tobytes()
+                    self.sequence += 1
+                    self.condition.notify_all()
+
+    def wait_frame(self, sequence):
+        # Blocks until a frame newer than sequence is encoded and returns it with its sequence number
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence != sequence or not self.running)
+            if not self.running:
+                return None, sequence
+            return self.jpeg, self.sequence
+
+    def subscribe(self):
+        queue = deque(maxlen=SPECTATOR_EVENT_BACKLOG)
+        queue.append(json.dumps({"type": "state", "total": self.score}))
+        with self.condition:
+            self.queues.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        with self.condition:
+            self.queues = [other for other in self.queues if other is not queue]
+
+    def wait_events(self, queue):
+        # Returns the queued events, an empty list after SPECTATOR_KEEPALIVE seconds without any, or None on shutdown
+        with self.condition:
+            self.condition.wait_for(lambda: queue or not self.running, timeout=SPECTATOR_KEEPALIVE)
+            if not self.running:
+                return None
+            events = list(queue)
+            queue.clear()
+            return events
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class AudioBus:
+    # The game posts sound names and returns at once; a daemon thread plays them. Posts of the same sound that
+    # arrive before the thread wakes are merged into one, a sound inside its cooldown is dropped, and each sound
+    # is decoded into a mixer buffer the first time it is played, so disabled effects are never loaded
+    def __init__(self, files=SOUND_FILES, cooldowns=SOUND_COOLDOWNS, channels=SOUND_CHANNELS):
+        self.files = files
+        self.cooldowns = cooldowns
+        self.sounds = {}
+        self.last_played = {}
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.running = bool(pygame.mixer.get_init())
+        if not self.running:
+            return
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), channels))
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.channel_started = [0.0] * channels
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def post(self, name):
+        with self.condition:
+            if self.running:
+                self.pending[name] = True
+                self.condition.notify()
+
+    def load(self, name):
+        if name not in self.sounds:
+            try:
+                self.sounds[name] = pygame.mixer.Sound(self.files[name])
+            except (pygame.error, FileNotFoundError) as e:
+                print(f"Error loading sound effect {name}: {e}")
+                self.sounds[name] = None
+        return self.sounds[name]
+
+    def play(self, name, now):
+        if now - self.last_played.get(name, -np.inf) < self.cooldowns.get(name, 0.0):
+            return
+        sound = self.load(name)
+        if sound is None:
+            return
+        free = [i for i, channel in enumerate(self.channels) if not channel.get_busy()]
+        index = free[0] if free else int(np.argmin(self.channel_started))
+        self.channels[index].play(sound)
+        self.channel_started[index] = now
+        self.last_played[name] = now
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or not self.running)
+                if not self.running:
+                    return
+                names = list(self.pending)
+                self.pending.clear()
+            for name in names:
+                self.play(name, time.monotonic())
+
+    def stop(self):
+        # Waits for a sound being started so the mixer can be shut down safely afterwards
+        with self.condition:
+            was_running, self.running = self.running, False
+            self.condition.notify()
+        if was_running:
+            self.thread.join(timeout=1.0)
+
+def load_splash_photo(path=SPLASH_IMAGE, cache=SPLASH_CACHE_FILE, size=SPLASH_SIZE):
+    # Tk decodes PNG itself, so the splash needs no PIL conversion. An image that is not already SPLASH_SIZE is
+    # scaled once into the cache file, which is rebuilt whenever the original is newer
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+        return tk.PhotoImage(file=cache)
+    photo = tk.PhotoImage(file=path)
+    if (photo.width(), photo.height()) == size:
+        return photo
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    cv2.imwrite(cache, cv2.resize(image, size, interpolation=cv2.INTER_AREA))
+    return tk.PhotoImage(file=cache)
+
+class StartupLoader:
+    # Brings up audio, the leaderboard and the camera in background threads while the splash is showing. The game
+    # waits for audio and the camera before it builds its window; the leaderboard fetch may finish later
+    def __init__(self):
+        self.cameras = None
+        self.camera = None  # (cap, width, height, frame) once the only webcam has been opened
+        self.camera_error = None
+        self.audio_thread = threading.Thread(target=load_audio_modules, daemon=True)
+        self.camera_thread = threading.Thread(target=self.open_camera, daemon=True)
+        self.audio_thread.start()
+        self.camera_thread.start()
+        threading.Thread(target=load_high_score, daemon=True).start()
+
+    def open_camera(self):
+        # With several webcams the choice is left to the game, which asks on the console
+        try:
+            self.cameras = list_webcams()
+            if len(self.cameras) == 1:
+                self.camera = open_webcam(self.cameras[0])
+        except Exception as e:
+            self.camera_error = e
+
+    def is_ready(self):
+        return not self.audio_thread.is_alive() and not self.camera_thread.is_alive()
+
+    def wait(self):
+        self.audio_thread.join()
+        self.camera_thread.join()
 
 class SplashScreen:
     def __init__(self, root, callback):
         self.root = root
         self.callback = callback
+        self.startup = None
         self.root.overrideredirect(True)
         self.root.attributes('-topmost', True)
 
         try:
-            splash_image = Image.open("splash.png").resize((800, 600), Image.Resampling.LANCZOS)
-            self.splash_photo = ImageTk.PhotoImage(splash_image)
+            self.splash_photo = load_splash_photo()
         except Exception as e:
             print(f"Error loading splash image: {e}")
             self.splash_photo = None
@@ -501,10 +2402,22 @@ class SplashScreen:
         x = (screen_width - 800) // 2
         y = (screen_height - 600) // 2
         self.root.geometry(f"800x600+{x}+{y}")
+        self.shown_time = time.monotonic()
+
+    def start(self, startup):
+        # Called once the splash has been drawn; the splash closes itself when startup is done
+        self.startup = startup
+        self.root.after(50, self.close_when_ready)
+
+    def close_when_ready(self):
+        if self.startup.is_ready() and time.monotonic() - self.shown_time >= SPLASH_MIN_DURATION:
+            self.close_splash()
+        else:
+            self.root.after(50, self.close_when_ready)
 
     def close_splash(self, event=None):
         self.root.destroy()
-        self.callback()
+        self.callback(self.startup)
 
 class CustomDialog:
     def __init__(self, parent, title, prompt, show_special_option=False):
@@ -677,6 +2590,7 @@ class OptionsWindow:
         try:
             BALL_COLOR_RANGE["lower_white"] = [int(self.entries[0].get()), int(self.entries[1].get()), int(self.entries[2].get())]
             BALL_COLOR_RANGE["upper_white"] = [int(self.entries[3].get()), int(self.entries[4].get()), int(self.entries[5].get())]
+            self.game.detector.update_thresholds()
             save_config(not self.sound_effects_var.get(), self.game.tutorial_shown)
             print("Options saved")
         except ValueError:
@@ -734,7 +2648,9 @@ class HelpWindow:
         self.on_close_callback()
 
 class WhiffleGame:
-    def __init__(self, root):
+    def __init__(self, root, startup=None):
+        startup = startup or StartupLoader()
+        startup.wait()
         self.root = root
         self.root.title("Whiffle Playfield")
         self.root.geometry("800x600")
@@ -743,21 +2659,24 @@ class WhiffleGame:
         self.new_high_score_prompted = False
         self.is_timed_mode = False
         self.time_remaining = 0
-        self.timer_id = None
+        self.clock = GameClock()
+        self.timers = TimerScheduler(self.clock)
+        self.game_timer = None
+        self.score_log = open_score_log()
         self.power_up_zone = None
         self.power_up = None
+        self.power_up_end_logged = True
         self.power_up_label = None
-        self.last_power_up_spawn = 0
-        self.frame_delay = 10
-        self.last_frame_time = time.time()
+        self.last_power_up_spawn = -POWER_UP_SPAWN_INTERVAL
+        self.scheduler = FrameScheduler()
+        self.frame_loop_id = None
+        self.first_frame_time = None
+        self.renderer = None
+        self.spectator = None
+        self.display_balls = []
+        self.flash_until = 0.0
 
-        try:
-            self.ball_detected_sound = pygame.mixer.Sound("ball_detected.wav")
-            self.score_sound = pygame.mixer.Sound("score.wav")
-            self.game_start_sound = pygame.mixer.Sound("game_start.wav")
-        except pygame.error as e:
-            print(f"Error loading sound effects: {e}")
-            self.ball_detected_sound = self.score_sound = self.game_start_sound = None
+        self.audio = AudioBus()
 
         try:
             pygame.mixer.music.load("background_music.mp3")
@@ -788,9 +2707,20 @@ class WhiffleGame:
         self.canvas = tk.Canvas(self.root, bg="#2E2E2E", highlightthickness=2, highlightbackground="#2196F3")
         self.canvas.pack(fill="both", expand=True, padx=10, pady=10)
         self.canvas.bind("<Button-1>", self.canvas_click)
-
-        self.save_button = ttk.Button(self.root, text="Save Zones", style="Custom.TButton", command=self.queue_save_zones, state="disabled")
-        self.save_button.pack(pady=5)
+        self.canvas.bind("<B1-Motion>", self.canvas_drag)
+
+        calibration_frame = ttk.Frame(self.root)
+        calibration_frame.pack(pady=5)
+        self.save_button = ttk.Button(calibration_frame, text="Save Zones", style="Custom.TButton", command=self.queue_save_zones, state="disabled")
+        self.save_button.pack(side="left", padx=5)
+        self.auto_calibrate_button = ttk.Button(calibration_frame, text="Auto Calibrate", style="Custom.TButton", command=self.auto_calibrate_zones)
+        self.auto_calibrate_button.pack(side="left", padx=5)
+        self.rectify_button = ttk.Button(calibration_frame, text="Rectify View", style="Custom.TButton", command=self.toggle_rectify)
+        self.rectify_button.pack(side="left", padx=5)
+        self.learn_mask_button = ttk.Button(calibration_frame, text="Learn Mask", style="Custom.TButton", command=self.learn_exclusion_mask)
+        self.learn_mask_button.pack(side="left", padx=5)
+        self.edit_mask_button = ttk.Button(calibration_frame, text="Edit Mask", style="Custom.TButton", command=self.toggle_mask_editor)
+        self.edit_mask_button.pack(side="left", padx=5)
 
         self.stats_frame = ttk.Frame(self.root)
         self.stats_frame.pack(fill="x", padx=10, pady=5)
@@ -805,30 +2735,34 @@ class WhiffleGame:
         self.res_label = tk.Label(self.stats_frame, text="Res: 0x0", font=("Helvetica", 12), bg="#2E2E2E", fg="white")
         self.res_label.pack(side="right", padx=10)
 
-        webcam_index = select_webcam()
-        if webcam_index is None:
-            self.root.destroy()
-            return
-
         try:
-            self.cap = cv2.VideoCapture(webcam_index, WEBCAM_BACKEND)
-            if not self.cap.isOpened():
-                print(f"Failed to open webcam with backend {WEBCAM_BACKEND}, trying alternate backend {ALTERNATE_WEBCAM_BACKEND}")
-                self.cap = cv2.VideoCapture(webcam_index, ALTERNATE_WEBCAM_BACKEND)
-            if not self.cap.isOpened():
-                raise Exception("Could not open webcam with any backend.")
-            self.width, self.height, initial_frame = set_webcam_resolution(self.cap)
-            if self.width is None:
-                raise Exception("Could not set resolution.")
+            if startup.camera_error:
+                raise startup.camera_error
+            if startup.camera:
+                self.cap, self.width, self.height, initial_frame = startup.camera
+            else:
+                webcam_index = select_webcam(startup.cameras)
+                if webcam_index is None:
+                    self.root.destroy()
+                    return
+                self.cap, self.width, self.height, initial_frame = open_webcam(webcam_index)
         except Exception as e:
             tk.messagebox.showerror("Error", f"Webcam initialization failed: {e}")
             self.root.destroy()
             return
 
-        global current_score, scored_ball_ids
+        global current_score
         current_score = 0
-        scored_ball_ids.clear()
-        self.point_zones, self.special_hole = load_point_zones()
+        ball_ids.reset()
+        self.rectifier = Rectifier()
+        self.picking_corners = None
+        self.exclusion = ExclusionMask()
+        self.exclusion.load()
+        self.editing_mask = False
+        if self.rectifier.load((self.width, self.height)):
+            initial_frame = self.rectifier.rectify(initial_frame)
+            self.rectify_button.config(text="Camera View")
+        self.point_zones, self.special_hole = self.load_zones()
         self.calibrating = not self.point_zones and not self.special_hole
         self.zone_count = len(self.point_zones)
         self.special_hole_defined = bool(self.special_hole)
@@ -844,58 +2778,56 @@ class WhiffleGame:
         self.special_hole_text = None
         self.power_up_zone_circle = None
         self.power_up_zone_text = None
-        self.tracker = CentroidTracker(max_disappeared=5)
-        self.previous_balls = []
-        self.last_red_score_time = 0.0
-        self.particles = []
+        self.tracker = create_tracker()
+        self.occupancy = HoleOccupancy()
+        self.settled = SettledBallRegistry()
+        self.detector = create_detector()
+        self.registration = LayoutRegistration()
+        self.reference_outdated = False
+        if not self.calibrating:
+            if self.registration.load():
+                self.registration.start()
+            else:
+                self.reference_outdated = True  # Zones saved without a reference get one from the first scored frame
+        self.previous_ball_keys = set()
+        self.last_red_score_time = -RED_BALL_COOLDOWN
+        self.particles = ParticleSystem()
         self.rendered_width = 0
         self.rendered_height = 0
         self.rendered_offset_x = 0
         self.rendered_offset_y = 0
+        if RENDERER == "pygame":
+            try:
+                self.renderer = PygameRenderer()
+            except pygame.error as e:
+                tk.messagebox.showwarning("Renderer", f"Could not open the pygame display ({e}). Using the Tk canvas.")
+        if SPECTATOR_ENABLED:
+            try:
+                self.spectator = SpectatorServer()
+            except OSError as e:
+                tk.messagebox.showwarning("Spectator Stream", f"Could not start the spectator stream on port {SPECTATOR_PORT} ({e}).")
 
         if self.calibrating:
             self.save_button.config(state="normal")
 
-        if self.game_start_sound and self.sound_effects_enabled:
-            self.game_start_sound.play()
+        if self.sound_effects_enabled:
+            self.audio.post("game_start")
 
         if not self.tutorial_shown:
             self.tutorial_shown = True
             save_config(self.sound_effects_enabled, self.tutorial_shown)
             TutorialWindow(self.resume_frame)
 
-        self.root.after(100, self.update_frame)
-
-    def create_particle(self, x, y):
-        return {
-            "x": x, "y": y, "size": random.uniform(2, PARTICLE_MAX_SIZE),
-            "dx": random.uniform(-PARTICLE_MAX_SPEED, PARTICLE_MAX_SPEED),
-            "dy": random.uniform(-PARTICLE_MAX_SPEED, PARTICLE_MAX_SPEED),
-            "lifetime": PARTICLE_LIFETIME, "start_time": time.time() * 1000,
-            "color": random.choice(["yellow", "orange", "red"])
-        }
-
-    def spawn_particle_explosion(self, x, y):
-        for _ in range(PARTICLE_COUNT):
-            self.particles.append(self.create_particle(x, y))
-
-    def update_particles(self):
-        current_time = time.time() * 1000
-        self.particles = [p for p in self.particles if (current_time - p["start_time"]) <= p["lifetime"]]
-        for p in self.particles:
-            elapsed = current_time - p["start_time"]
-            p["x"] += p["dx"]
-            p["y"] += p["dy"]
-            alpha = 1.0 - (elapsed / p["lifetime"])
-            size = p["size"] * alpha
-            self.canvas.create_oval(p["x"] - size, p["y"] - size, p["x"] + size, p["y"] + size, fill=p["color"], outline="")
+        if self.score_log:
+            self.score_log.start_game(self.clock.now())
+        self.frame_loop_id = self.root.after(100, self.update_frame)
 
     def spawn_power_up_zone(self):
-        if not self.point_zones or (time.time() - self.last_power_up_spawn < POWER_UP_SPAWN_INTERVAL) or (self.power_up_zone and self.power_up_zone.is_active()):
+        if not self.point_zones or (self.clock.now() - self.last_power_up_spawn < POWER_UP_SPAWN_INTERVAL) or (self.power_up_zone and self.power_up_zone.is_active()):
             return
         zone = random.choice(self.point_zones)
-        self.power_up_zone = PowerUpZone(zone[0], zone[1], ZONE_RADIUS, POWER_UP_DURATION)
-        self.last_power_up_spawn = time.time()
+        self.power_up_zone = PowerUpZone(zone[0], zone[1], ZONE_RADIUS, POWER_UP_DURATION, self.timers)
+        self.last_power_up_spawn = self.clock.now()
 
     def file_menu(self):
         self.paused = True
@@ -914,7 +2846,7 @@ class WhiffleGame:
         dialog = CustomDialog(window, "Save", "Enter filename:")
         filename, _ = dialog.show()
         if filename != "N/A":
-            save_point_zones(self.point_zones, self.special_hole, filename)
+            self.save_zones(filename)
         window.destroy()
         self.resume_frame()
 
@@ -922,9 +2854,10 @@ class WhiffleGame:
         dialog = CustomDialog(window, "Load", "Enter filename:")
         filename, _ = dialog.show()
         if filename != "N/A":
-            self.point_zones, self.special_hole = load_point_zones(filename)
+            self.point_zones, self.special_hole = self.load_zones(filename)
             self.zone_count = len(self.point_zones)
             self.special_hole_defined = bool(self.special_hole)
+            self.invalidate_reference()
         window.destroy()
         self.resume_frame()
 
@@ -944,42 +2877,57 @@ class WhiffleGame:
     def new_game(self, classic=True, window=None):
         if window:
             window.destroy()
-        global current_score, scored_ball_ids, RED_BALL_LIMIT
+        global current_score, RED_BALL_LIMIT
+        if self.score_log:
+            self.score_log.end_game(self.clock.now(), current_score)
         current_score = 0
-        scored_ball_ids.clear()
+        ball_ids.reset()
         RED_BALL_LIMIT = 1
-        self.tracker = CentroidTracker(max_disappeared=5)
-        self.previous_balls = []
+        self.tracker = create_tracker()
+        self.occupancy.reset()
+        self.settled.reset()
+        self.previous_ball_keys = set()
         self.new_high_score_prompted = False
         self.power_up_zone = None
         self.power_up = None
-        self.last_power_up_spawn = 0
-        self.frame_delay = 10
+        self.last_power_up_spawn = -POWER_UP_SPAWN_INTERVAL
+        self.last_red_score_time = -RED_BALL_COOLDOWN
+        self.scheduler.set_render_rate(RENDER_FPS)
         self.power_up_label.config(text="Power-Up: None")
+        if self.spectator:
+            self.spectator.publish_event("new_game", mode="classic" if classic else "timed", total=0)
+        self.timers.clear()
         self.is_timed_mode = not classic
         if self.is_timed_mode:
             self.time_remaining = TIMED_MODE_DURATION
             self.timer_label.config(text=f"Time: {self.time_remaining // 60}m{self.time_remaining % 60:02d}s")
-            self.start_timer()
+            self.game_timer = self.timers.schedule(TIMED_MODE_DURATION, self.end_timed_mode)
         else:
             self.time_remaining = 0
             self.timer_label.config(text="Time: N/A")
-            if self.timer_id:
-                self.root.after_cancel(self.timer_id)
-                self.timer_id = None
-        if self.game_start_sound and self.sound_effects_enabled:
-            self.game_start_sound.play()
+            self.game_timer = None
+        if self.score_log:
+            self.score_log.start_game(self.clock.now(), self.is_timed_mode)
+        if self.sound_effects_enabled:
+            self.audio.post("game_start")
         self.resume_frame()
 
-    def start_timer(self):
-        if self.time_remaining > 0:
-            self.time_remaining -= 1
+    def update_timer_label(self):
+        # The countdown itself is a game clock timer; the label only changes when the whole second does
+        if not self.timers.is_pending(self.game_timer):
+            return
+        time_remaining = int(np.ceil(self.timers.remaining(self.game_timer)))
+        if time_remaining != self.time_remaining:
+            self.time_remaining = time_remaining
             self.timer_label.config(text=f"Time: {self.time_remaining // 60}m{self.time_remaining % 60:02d}s")
-            self.timer_id = self.root.after(1000, self.start_timer)
-        else:
-            self.timer_label.config(text="Time: 0m00s")
-            self.paused = True
-            self.check_high_score()
+
+    def end_timed_mode(self):
+        self.time_remaining = 0
+        self.timer_label.config(text="Time: 0m00s")
+        if self.score_log:
+            self.score_log.end_game(self.clock.now(), current_score)
+        self.paused = True
+        self.check_high_score()
 
     def check_high_score(self):
         global current_score
@@ -1023,18 +2971,154 @@ class WhiffleGame:
         OptionsWindow(self.resume_frame, self)
 
     def resume_frame(self):
+        # Restart the single frame loop; pending ticks are cancelled so resuming never starts a second loop
         self.paused = False
+        if self.frame_loop_id:
+            self.root.after_cancel(self.frame_loop_id)
+        self.scheduler.reset()
         self.update_frame()
 
     def queue_save_zones(self):
         if self.calibrating:
             self.save_triggered = True
 
-    def canvas_click(self, event):
-        if not self.calibrating:
+    def finish_calibration(self):
+        # Saves the zones, makes the current frame the registration reference and starts scoring
+        self.save_zones()
+        self.update_reference()
+        self.calibrating = False
+        self.save_triggered = False
+
+    def update_reference(self):
+        self.registration.set_reference(self.frame, self.point_zones, self.special_hole)
+        self.registration.save()
+        self.registration.start()
+        self.reference_outdated = False
+
+    def invalidate_reference(self):
+        # The reference no longer matches the view or the zones; it is rebuilt from the next scored frame
+        self.registration.clear_reference()
+        self.reference_outdated = True
+
+    def load_zones(self, filename=CALIBRATION_FILE):
+        # Zone files always hold camera coordinates; convert when the view is rectified
+        point_zones, special_hole = load_point_zones(filename)
+        if self.rectifier.is_enabled():
+            point_zones, special_hole = self.rectifier.to_rectified(point_zones, special_hole)
+        return point_zones, special_hole
+
+    def save_zones(self, filename=CALIBRATION_FILE):
+        point_zones, special_hole = self.point_zones, self.special_hole
+        if self.rectifier.is_enabled():
+            point_zones, special_hole = self.rectifier.to_camera(point_zones, special_hole)
+        save_point_zones(point_zones, special_hole, filename)
+
+    def toggle_rectify(self):
+        self.paused = True
+        if self.rectifier.is_enabled():
+            if tk.messagebox.askyesno("Rectify View", "Switch back to the camera view and delete the rectification "
+                                                      "and exclusion mask?"):
+                self.point_zones, self.special_hole = self.rectifier.to_camera(self.point_zones, self.special_hole)
+                self.rectifier.clear()
+                self.invalidate_reference()
+                self.exclusion.clear()
+                self.rectify_button.config(text="Rectify View")
+        else:
+            self.picking_corners = []
+            tk.messagebox.showinfo("Rectify View", "Click the four playfield corners in order: "
+                                                   "top-left, top-right, bottom-right, bottom-left. "
+                                                   "The exclusion mask will need to be rebuilt afterwards.")
+        self.paused = False
+
+    def add_rectify_corner(self, x_frame, y_frame):
+        self.picking_corners.append((x_frame, y_frame))
+        print(f"Rectify corner {len(self.picking_corners)}/4 at ({x_frame}, {y_frame})")
+        if len(self.picking_corners) < 4:
             return
+        self.rectifier.configure(self.picking_corners, (self.width, self.height))
+        self.rectifier.save()
+        self.picking_corners = None
+        self.point_zones, self.special_hole = self.rectifier.to_rectified(self.point_zones, self.special_hole)
+        self.invalidate_reference()
+        self.exclusion.clear()
+        self.rectify_button.config(text="Camera View")
+
+    def learn_exclusion_mask(self):
+        self.paused = True
+        if tk.messagebox.askokcancel("Learn Mask", "Remove all balls from the playfield, then click OK. "
+                                                   f"The next {EXCLUSION_LEARN_FRAMES} frames are used to find areas "
+                                                   "that look like balls."):
+            self.exclusion.start_learning()
+        self.paused = False
 
-        x, y = event.x, event.y
+    def toggle_mask_editor(self):
+        self.editing_mask = not self.editing_mask
+        if self.editing_mask:
+            self.edit_mask_button.config(text="Done Editing")
+            self.paused = True
+            tk.messagebox.showinfo("Edit Mask", "Click or drag to exclude areas from detection. "
+                                                "Hold Shift to erase. Click 'Done Editing' to save.")
+            self.paused = False
+        else:
+            self.edit_mask_button.config(text="Edit Mask")
+            self.exclusion.save()
+
+    def auto_calibrate_zones(self):
+        if self.frame is None:
+            return
+        layout = load_hole_layout()
+        if not layout:
+            tk.messagebox.showwarning("Auto Calibration", f"No hole layout found. Add {HOLE_LAYOUT_FILE} or calibrate manually.")
+            return
+        point_zones, special_hole, matched = auto_calibrate(self.frame, layout)
+        self.point_zones, self.special_hole = point_zones, special_hole
+        self.zone_count = len(self.point_zones)
+        self.special_hole_defined = bool(self.special_hole)
+        self.calibrating = True
+        self.save_button.config(state="normal")
+        self.paused = True
+        tk.messagebox.showinfo("Auto Calibration", f"Found {matched} of {len(layout)} holes. Click a zone to correct it, "
+                                                   "then click 'Save Zones' to finish.")
+        self.paused = False
+
+    def find_zone_at(self, x_frame, y_frame):
+        for index, (zone_x, zone_y, zone_radius, _) in enumerate(self.point_zones):
+            if np.sqrt((zone_x - x_frame)**2 + (zone_y - y_frame)**2) <= zone_radius:
+                return index
+        return None
+
+    def correct_zone(self, x_frame, y_frame):
+        # Clicking an existing zone moves it to the click and lets the points be changed
+        if self.special_hole:
+            special_x, special_y, special_radius, special_points = self.special_hole
+            if np.sqrt((special_x - x_frame)**2 + (special_y - y_frame)**2) <= special_radius:
+                dialog = CustomDialog(self.root, "Correct Zone", f"Points for special hole (was {special_points}):")
+                self.paused = True
+                points, _ = dialog.show()
+                self.paused = False
+                try:
+                    self.special_hole = (x_frame, y_frame, ZONE_RADIUS, int(points) if points != "N/A" else special_points)
+                except ValueError:
+                    tk.messagebox.showwarning("Warning", "Invalid points value. Zone not changed.")
+                return True
+
+        index = self.find_zone_at(x_frame, y_frame)
+        if index is None:
+            return False
+        old_points = self.point_zones[index][3]
+        dialog = CustomDialog(self.root, "Correct Zone", f"Points for zone at ({x_frame}, {y_frame}) (was {old_points}):")
+        self.paused = True
+        points, _ = dialog.show()
+        self.paused = False
+        try:
+            self.point_zones[index] = (x_frame, y_frame, ZONE_RADIUS, int(points) if points != "N/A" else old_points)
+        except ValueError:
+            tk.messagebox.showwarning("Warning", "Invalid points value. Zone not changed.")
+        return True
+
+    def canvas_to_frame(self, x, y):
+        if self.renderer:
+            return self.renderer.screen_to_frame(x, y)
         canvas_width, canvas_height = self.canvas.winfo_width(), self.canvas.winfo_height()
         if self.frame is not None and canvas_width > 0 and canvas_height > 0:
             frame_width, frame_height = self.frame.shape[1], self.frame.shape[0]
@@ -1053,6 +3137,29 @@ class WhiffleGame:
             y_frame = int((y - offset_y) * scale_y)
         else:
             x_frame, y_frame = x, y
+        return x_frame, y_frame
+
+    def canvas_drag(self, event):
+        if self.editing_mask and self.frame is not None:
+            x_frame, y_frame = self.canvas_to_frame(event.x, event.y)
+            self.exclusion.paint(x_frame, y_frame, self.frame.shape, exclude=not event.state & 0x1)
+
+    def canvas_click(self, event):
+        if self.editing_mask:
+            self.canvas_drag(event)
+            return
+        if not self.calibrating and self.picking_corners is None:
+            return
+
+        x, y = event.x, event.y
+        x_frame, y_frame = self.canvas_to_frame(x, y)
+
+        if self.picking_corners is not None:
+            self.add_rectify_corner(x_frame, y_frame)
+            return
+
+        if self.correct_zone(x_frame, y_frame):
+            return
 
         radius = CALIBRATION_VISUAL_RADIUS
         dialog = CustomDialog(self.root, "Points", f"Points for zone at ({x_frame}, {y_frame}):", 
@@ -1084,26 +3191,39 @@ class WhiffleGame:
             tk.messagebox.showinfo("Calibration", f"Reached {TOTAL_ZONES} zones. Click 'Save Zones' to finish or continue adding.")
 
     def update_frame(self):
+        # One tick of the frame loop: detection and scoring run when their deadline is due, rendering when its own is.
+        # Both use the newest camera frame, and the loop sleeps until the nearer deadline
         if self.paused:
-            self.root.after(self.frame_delay, self.update_frame)
-            return
-
-        current_time = time.time()
-        target_frame_time = 0.033  # 30 FPS (1/30 ≈ 0.033 seconds)
-        if current_time - self.last_frame_time < target_frame_time:
-            self.root.after(int((target_frame_time - (current_time - self.last_frame_time)) * 1000), self.update_frame)
+            self.clock.pause()
+            self.frame_loop_id = self.root.after(100, self.update_frame)
             return
-        self.last_frame_time = current_time
-
-        print("Updating frame...")
-        self.read_frame()
-        self.render_frame()
-        self.update_game_logic(self.rendered_width, self.rendered_height, self.rendered_offset_x, self.rendered_offset_y)
-
-        elapsed = (time.time() - current_time) * 1000  # Time taken in milliseconds
-        self.frame_delay = max(33, int(elapsed * 1.5))  # Dynamic adjustment, minimum 30 FPS
-        print(f"Frame processed in {elapsed}ms, next delay: {self.frame_delay}ms")
-        self.root.after(self.frame_delay, self.update_frame)
+        self.clock.resume()
+
+        current_time = time.monotonic()
+        render_due = self.scheduler.render_due(current_time)
+        detection_due = self.scheduler.detection_due(current_time)
+        if render_due or detection_due:
+            self.read_frame()
+        if detection_due:
+            if self.renderer:
+                self.rendered_width, self.rendered_height, self.rendered_offset_x, self.rendered_offset_y = \
+                    self.renderer.layout(self.frame.shape)
+            self.update_game_logic(self.rendered_width, self.rendered_height, self.rendered_offset_x, self.rendered_offset_y)
+            if self.spectator:
+                self.spectator.publish_frame(self.frame, self.point_zones, self.special_hole, self.display_balls, current_score)
+        if render_due:
+            if self.renderer:
+                self.renderer.render(self)
+                self.renderer.handle_events(self)
+            else:
+                self.render_frame()
+            if self.first_frame_time is None:
+                self.first_frame_time = time.perf_counter()
+                print(f"First frame shown {self.first_frame_time - startup_time:.2f}s after import")
+        if render_due or detection_due:
+            elapsed = (time.monotonic() - current_time) * 1000
+            print(f"Frame processed in {elapsed:.1f}ms (render: {render_due}, detection: {detection_due})")
+        self.frame_loop_id = self.root.after(self.scheduler.delay_ms(time.monotonic()), self.update_frame)
 
     def read_frame(self):
         try:
@@ -1112,6 +3232,8 @@ class WhiffleGame:
                 tk.messagebox.showerror("Error", "Failed to read frame from webcam.")
                 self.destroy()
             else:
+                if self.rectifier.is_enabled():
+                    self.frame = self.rectifier.rectify(self.frame)
                 print("Frame captured successfully")
         except Exception as e:
             tk.messagebox.showerror("Error", f"Frame capture failed: {e}")
@@ -1119,9 +3241,14 @@ class WhiffleGame:
 
     def render_frame(self):
         self.canvas.delete("all")
+        self.red_zone_circles = []
+        self.red_zone_texts = []
+        self.green_ball_circles = []
         if self.frame is not None:
             frame_rgb = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
+            if self.editing_mask and self.exclusion.is_enabled():
+                excluded = self.exclusion.fit(self.frame.shape) == 0
+                frame_rgb[excluded] = frame_rgb[excluded] // 2 + np.uint8([127, 0, 0])
             canvas_width, canvas_height = self.canvas.winfo_width(), self.canvas.winfo_height()
             if canvas_width > 0 and canvas_height > 0:
                 aspect_ratio = self.frame.shape[1] / self.frame.shape[0]
@@ -1131,15 +3258,18 @@ class WhiffleGame:
                     new_width = int(canvas_height * aspect_ratio)
                 else:
                     new_width = canvas_width
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                frame_rgb = cv2.resize(frame_rgb, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
             else:
                 new_width, new_height = self.frame.shape[1], self.frame.shape[0]
 
+            # Particles are drawn into the display image, in its pixel coordinates
+            self.particles.update()
+            self.particles.draw(frame_rgb)
+
             offset_x = (canvas_width - new_width) // 2
             offset_y = (canvas_height - new_height) // 2
-            self.photo = ImageTk.PhotoImage(image=img)
+            self.photo = ImageTk.PhotoImage(image=Image.fromarray(frame_rgb))
             self.canvas.create_image(offset_x, offset_y, image=self.photo, anchor="nw")
-            self.update_particles()
 
             # Store dimensions for use in update_game_logic
             self.rendered_width = new_width
@@ -1173,6 +3303,17 @@ class WhiffleGame:
                                                                     x_canvas + r_canvas, y_canvas + r_canvas, outline="green", width=2)
                 self.power_up_zone_text = self.canvas.create_text(x_canvas, y_canvas, text="Power-Up", fill="green", font=("Helvetica", 10))
 
+            for (x, y, r, ball_id, color, _) in self.display_balls:
+                x_canvas = int(x * (new_width / self.frame.shape[1]) + offset_x)
+                y_canvas = int(y * (new_height / self.frame.shape[0]) + offset_y)
+                r_canvas = int(r * (new_width / self.frame.shape[1]))
+                outline_color = "red" if color == "red" else "green"
+                self.green_ball_circles.append(self.canvas.create_oval(x_canvas - r_canvas, y_canvas - r_canvas,
+                                                                       x_canvas + r_canvas, y_canvas + r_canvas,
+                                                                       outline=outline_color, width=2))
+                self.green_ball_circles.append(self.canvas.create_text(x_canvas, y_canvas - r_canvas - 10, 
+                                                                       text=f"ID: {ball_id} ({color})", fill="yellow", font=("Helvetica", 8)))
+
             if self.power_up and self.power_up.is_active():
                 if self.power_up.power_up_type == "Slow Motion":
                     self.canvas.configure(highlightbackground="blue")
@@ -1190,6 +3331,19 @@ class WhiffleGame:
 
     def update_game_logic(self, new_width, new_height, offset_x, offset_y):
         global current_score, RED_BALL_LIMIT
+        self.timers.poll()
+        self.update_timer_label()
+        if self.exclusion.learning:
+            mask_white, mask_red = self.detector.masks(self.frame)
+            if self.exclusion.learn(mask_white, mask_red):
+                excluded = self.exclusion.finish_learning(self.point_zones, self.special_hole)
+                self.exclusion.save()
+                print(f"Exclusion mask learned, {excluded * 100:.1f}% of the playfield excluded")
+
+        # Save Zones is only enabled while calibrating, so the save has to be handled before that branch
+        if self.save_triggered:
+            self.finish_calibration()
+
         if self.calibrating:
             cv2.putText(self.frame, f"Click to define zones ({self.zone_count + (1 if self.special_hole else 0)}/{TOTAL_ZONES})", 
                         (10, self.frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
@@ -1204,72 +3358,90 @@ class WhiffleGame:
                 else:
                     self.power_up_label.config(text=f"Power-Up: {self.power_up.power_up_type}")
                 if self.power_up.power_up_type == "Slow Motion":
-                    self.frame_delay = 50
+                    self.scheduler.set_render_rate(SLOW_MOTION_RENDER_FPS)
             else:
                 self.power_up_label.config(text="Power-Up: None")
-                self.frame_delay = 10
+                self.scheduler.set_render_rate(RENDER_FPS)
                 if self.power_up and self.power_up.power_up_type == "Double Balls":
                     RED_BALL_LIMIT = 1
-
-            if self.save_triggered:
-                save_point_zones(self.point_zones, self.special_hole)
-                self.calibrating = False
-                self.save_triggered = False
-
-            tracked_balls = detect_and_track_balls(self.frame, self.tracker)
+                if self.power_up and not self.power_up_end_logged:
+                    self.power_up_end_logged = True
+                    if self.score_log:
+                        self.score_log.record(EVENT_POWER_UP_END, self.clock.now(), detail=POWER_UP_TYPES.index(self.power_up.power_up_type))
+
+            if self.reference_outdated:
+                self.update_reference()
+            registration_update = self.registration.take_update()
+            if registration_update:
+                self.point_zones, self.special_hole, moved = registration_update
+                self.exclusion.warp(moved)
+            self.registration.submit_frame(self.frame)
+
+            moving_balls = detect_and_track_balls(self.frame, self.tracker, self.detector, self.settled,
+                                                  self.exclusion.fit(self.frame.shape))
+            tracked_balls = moving_balls + self.settled.balls()
             total_balls = len(tracked_balls)
-            new_balls = [ball for ball in tracked_balls if ball[3] not in [pb[3] for pb in self.previous_balls]]
-            if new_balls and self.ball_detected_sound and self.sound_effects_enabled:
-                self.ball_detected_sound.play()
-
+            ball_keys = {ball_ids.key(ball[3]) for ball in tracked_balls}
+            new_balls = ball_keys - self.previous_ball_keys
+            if new_balls and self.sound_effects_enabled:
+                self.audio.post("ball_detected")
+
+            self.occupancy.set_zones(self.point_zones, self.special_hole)
+            self.occupancy.update(tracked_balls, self.clock.now())
+            previous_score = current_score
             round_score, self.last_red_score_time, scored_positions, power_up_activated, power_up_type = calculate_score(
-                tracked_balls, self.point_zones, self.special_hole, self.power_up_zone, self.last_red_score_time, RED_BALL_COOLDOWN, self.power_up
+                moving_balls, self.point_zones, self.special_hole, self.power_up_zone, self.last_red_score_time, RED_BALL_COOLDOWN, self.power_up,
+                self.occupancy, self.clock.now(), self.score_log
             )
+            self.settled.observe(moving_balls, self.occupancy, self.frame, self.tracker)
+            if DETECTION_BACKGROUND:
+                self.detector.update_background(self.frame, tracked_balls)
             if power_up_activated and not (self.power_up and self.power_up.is_active()):
+                new_power_up = None
                 if power_up_type in ["Score Multiplier", "Double Balls"]:
-                    self.power_up = PowerUp(power_up_type)
+                    new_power_up = PowerUp(power_up_type)
                 elif power_up_type == "Slow Motion":
-                    self.power_up = PowerUp(power_up_type, POWER_UP_DURATION)
+                    new_power_up = PowerUp(power_up_type, POWER_UP_DURATION)
                 elif power_up_type == "Extra Time" and self.is_timed_mode:
-                    self.power_up = PowerUp(power_up_type)
-                    self.time_remaining += POWER_UP_EXTRA_TIME
-                self.power_up.activate()
+                    new_power_up = PowerUp(power_up_type)
+                    self.timers.extend(self.game_timer, POWER_UP_EXTRA_TIME)
+                if new_power_up:
+                    self.power_up = new_power_up
+                    self.power_up.activate(self.timers)
+                    self.power_up_end_logged = False
+                    if self.score_log:
+                        self.score_log.record(EVENT_POWER_UP_START, self.clock.now(), detail=POWER_UP_TYPES.index(self.power_up.power_up_type))
                 if power_up_type == "Double Balls":
                     RED_BALL_LIMIT = 2
 
             if round_score > 0:
-                if self.score_sound and self.sound_effects_enabled:
-                    self.score_sound.play()
-                self.canvas.configure(bg="yellow")
-                self.root.after(100, lambda: self.canvas.configure(bg="#2E2E2E"))
+                if self.sound_effects_enabled:
+                    self.audio.post("score")
+                if self.renderer:
+                    self.flash_until = time.time() + 0.1
+                else:
+                    self.canvas.configure(bg="yellow")
+                    self.root.after(100, lambda: self.canvas.configure(bg="#2E2E2E"))
                 for pos_x, pos_y in scored_positions:
-                    canvas_x = int(pos_x * (new_width / self.frame.shape[1]) + offset_x)
-                    canvas_y = int(pos_y * (new_height / self.frame.shape[0]) + offset_y)
-                    self.spawn_particle_explosion(canvas_x, canvas_y)
+                    self.particles.spawn(pos_x * (new_width / self.frame.shape[1]), pos_y * (new_height / self.frame.shape[0]))
             current_score += round_score
+            if current_score != previous_score and self.spectator:
+                self.spectator.publish_event("score", points=current_score - previous_score, total=current_score)
 
             if not self.is_timed_mode:
                 self.check_high_score()
 
-            for (x, y, r, ball_id, color) in tracked_balls:
-                x_canvas = int(x * (new_width / self.frame.shape[1]) + offset_x)
-                y_canvas = int(y * (new_height / self.frame.shape[0]) + offset_y)
-                r_canvas = int(r * (new_width / self.frame.shape[1]))
-                outline_color = "red" if color == "red" else "green"
-                self.green_ball_circles.append(self.canvas.create_oval(x_canvas - r_canvas, y_canvas - r_canvas,
-                                                                       x_canvas + r_canvas, y_canvas + r_canvas,
-                                                                       outline=outline_color, width=2))
-                self.green_ball_circles.append(self.canvas.create_text(x_canvas, y_canvas - r_canvas - 10, 
-                                                                       text=f"ID: {ball_id} ({color})", fill="yellow", font=("Helvetica", 8)))
+            self.display_balls = tracked_balls
 
             self.balls_label.config(text=f"Balls: {total_balls}")
             self.score_label.config(text=f"Score: {current_score}")
             self.res_label.config(text=f"Res: {self.width}x{self.height}")
-            self.previous_balls = tracked_balls
-            print(f"Updated game logic: {total_balls} balls detected, score: {current_score}")
+            self.previous_ball_keys = ball_keys
+            print(f"Updated game logic: {total_balls} balls detected ({len(self.settled)} settled), score: {current_score}")
 
-    def handle_input(self):
-        key = cv2.waitKey(1) & 0xFF
+    def handle_input(self, key=None):
+        if key is None:
+            key = cv2.waitKey(1) & 0xFF
         if key == ord('q'):
             save_high_score(high_score_initials, current_score)
             self.destroy()
@@ -1279,13 +3451,14 @@ class WhiffleGame:
             self.special_hole_defined = False
             self.calibrating = True
             self.zone_count = 0
-            global scored_ball_ids
-            scored_ball_ids.clear()
-            self.tracker = CentroidTracker(max_disappeared=5)
+            ball_ids.reset()
+            self.tracker = create_tracker()
+            self.occupancy.reset()
+            self.settled.reset()
             self.power_up_zone = None
             self.power_up = None
-            self.last_power_up_spawn = 0
-            self.frame_delay = 10
+            self.last_power_up_spawn = -POWER_UP_SPAWN_INTERVAL
+            self.scheduler.set_render_rate(RENDER_FPS)
             self.power_up_label.config(text="Power-Up: None")
             for item in self.zone_circles + self.red_zone_circles + self.green_ball_circles + self.zone_texts + self.red_zone_texts:
                 self.canvas.delete(item)
@@ -1308,21 +3481,212 @@ class WhiffleGame:
                 self.power_up_zone_text = None
 
     def destroy(self):
+        if hasattr(self, 'registration'):
+            self.registration.stop()
+        if DETECTION_BACKGROUND and hasattr(self, 'detector'):
+            self.detector.save()
         if hasattr(self, 'cap') and self.cap.isOpened():
             self.cap.release()
+        if self.renderer:
+            self.renderer.close()
+        if self.spectator:
+            self.spectator.stop()
+        if hasattr(self, 'audio'):
+            self.audio.stop()
+        if self.score_log:
+            self.score_log.end_game(self.clock.now(), current_score)
+            self.score_log.close()
         if pygame.mixer.get_init():
             pygame.mixer.music.stop()
             pygame.mixer.quit()
-        if self.timer_id:
-            self.root.after_cancel(self.timer_id)
         self.root.destroy()
 
-def start_game():
+class EventSink:
+    # Writes one JSON object per line to stdout or a file, or sends each one as a UDP datagram to a scoreboard
+    def __init__(self, target="stdout", path=HEADLESS_EVENTS_FILE, address=HEADLESS_EVENTS_ADDRESS):
+        self.target = target
+        self.stream = None
+        self.sock = None
+        if target == "stdout":
+            self.stream = sys.stdout
+        elif target == "file":
+            self.stream = open(path, "a")
+        elif target == "udp":
+            host, port = address.rsplit(":", 1)
+            self.address = (host, int(port))
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            raise ValueError(f"Unknown event target: {target}")
+
+    def emit(self, event_type, **fields):
+        line = json.dumps({"type": event_type, "time": round(time.time(), 3), **fields})
+        if self.sock:
+            self.sock.sendto(line.encode(), self.address)
+        else:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+        elif self.stream is not sys.stdout:
+            self.stream.close()
+
+class HeadlessGame:
+    # Camera, detector, tracker and scorer without any GUI, using the zones, rectification and exclusion mask saved
+    # by the windowed game. Power-ups and timed mode are on-screen features and are not run here
+    def __init__(self, cap, events, spectator=None):
+        global current_score
+        self.cap = cap
+        self.events = events
+        self.spectator = spectator
+        self.width, self.height, frame = set_webcam_resolution(cap)
+        if self.width is None:
+            raise RuntimeError("Could not set resolution.")
+        self.rectifier = Rectifier()
+        self.rectifier.load((self.width, self.height))
+        self.exclusion = ExclusionMask()
+        self.exclusion.load()
+        self.point_zones, self.special_hole = load_point_zones()
+        if self.rectifier.is_enabled():
+            self.point_zones, self.special_hole = self.rectifier.to_rectified(self.point_zones, self.special_hole)
+        if not self.point_zones and not self.special_hole:
+            raise RuntimeError(f"No zones in {CALIBRATION_FILE}. Calibrate with the windowed game first.")
+        self.registration = LayoutRegistration()
+        if self.registration.load():
+            self.registration.start()
+        current_score = 0
+        ball_ids.reset()
+        self.tracker = create_tracker()
+        self.detector = create_detector()
+        self.occupancy = HoleOccupancy()
+        self.settled = SettledBallRegistry()
+        self.previous_ball_keys = set()
+        self.clock = GameClock()
+        self.score_log = open_score_log()
+        self.last_red_score_time = -RED_BALL_COOLDOWN
+
+    def step(self, frame):
+        global current_score
+        registration_update = self.registration.take_update()
+        if registration_update:
+            self.point_zones, self.special_hole, moved = registration_update
+            self.exclusion.warp(moved)
+            self.events.emit("zones_moved")
+        self.registration.submit_frame(frame)
+
+        moving_balls = detect_and_track_balls(frame, self.tracker, self.detector, self.settled, self.exclusion.fit(frame.shape))
+        tracked_balls = moving_balls + self.settled.balls()
+        ball_keys = {ball_ids.key(ball[3]) for ball in tracked_balls}
+        new_keys = ball_keys - self.previous_ball_keys
+        for x, y, _, ball_id, color, _ in tracked_balls:
+            if ball_ids.key(ball_id) in new_keys:
+                self.events.emit("ball", id=int(ball_id), color=color, x=round(float(x), 1), y=round(float(y), 1))
+        self.previous_ball_keys = ball_keys
+
+        self.occupancy.set_zones(self.point_zones, self.special_hole)
+        self.occupancy.update(tracked_balls, self.clock.now())
+        previous_score = current_score
+        round_score, self.last_red_score_time, scored_positions, _, _ = calculate_score(
+            moving_balls, self.point_zones, self.special_hole, None, self.last_red_score_time, RED_BALL_COOLDOWN, None,
+            self.occupancy, self.clock.now(), self.score_log
+        )
+        current_score += round_score
+        self.settled.observe(moving_balls, self.occupancy, frame, self.tracker)
+        if DETECTION_BACKGROUND:
+            self.detector.update_background(frame, tracked_balls)
+        if scored_positions:
+            self.events.emit("score", points=current_score - previous_score, total=current_score,
+                             positions=[[round(float(x), 1), round(float(y), 1)] for x, y in scored_positions])
+        if self.spectator:
+            if current_score != previous_score:
+                self.spectator.publish_event("score", points=current_score - previous_score, total=current_score)
+            self.spectator.publish_frame(frame, self.point_zones, self.special_hole, tracked_balls, current_score)
+
+    def run(self):
+        self.events.emit("start", width=self.width, height=self.height, zones=len(self.point_zones))
+        if self.score_log:
+            self.score_log.start_game(self.clock.now())
+        interval = 1.0 / DETECTION_FPS
+        next_tick = time.monotonic()
+        try:
+            while True:
+                ret, frame = self.cap.read()
+                if not ret:
+                    self.events.emit("error", message="Failed to read frame from webcam.")
+                    break
+                if self.rectifier.is_enabled():
+                    frame = self.rectifier.rectify(frame)
+                self.step(frame)
+                next_tick += interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.events.emit("stop", total=current_score)
+            if self.score_log:
+                self.score_log.end_game(self.clock.now(), current_score)
+                self.score_log.close()
+            self.registration.stop()
+            if self.spectator:
+                self.spectator.stop()
+            if DETECTION_BACKGROUND:
+                self.detector.save()
+            self.cap.release()
+
+def run_headless(argv):
+    parser = argparse.ArgumentParser(description="Run the Whiffle scorer without a window.")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--camera", type=int, default=0, help="Webcam index")
+    parser.add_argument("--events", choices=["stdout", "file", "udp"], default="stdout", help="Where game events go")
+    parser.add_argument("--events-file", default=HEADLESS_EVENTS_FILE)
+    parser.add_argument("--events-address", default=HEADLESS_EVENTS_ADDRESS, help="host:port for UDP events")
+    parser.add_argument("--spectator", action="store_true", default=SPECTATOR_ENABLED, help="Serve the spectator stream")
+    parser.add_argument("--spectator-port", type=int, default=SPECTATOR_PORT)
+    args = parser.parse_args(argv)
+
+    events = EventSink(args.events, args.events_file, args.events_address)
+    if args.events == "stdout":
+        sys.stdout = sys.stderr  # Keep log prints out of the event stream
+    cap = cv2.VideoCapture(args.camera, WEBCAM_BACKEND)
+    if not cap.isOpened():
+        cap = cv2.VideoCapture(args.camera, ALTERNATE_WEBCAM_BACKEND)
+    if not cap.isOpened():
+        events.emit("error", message=f"Could not open webcam {args.camera}.")
+        events.close()
+        return
+    spectator = None
+    if args.spectator:
+        try:
+            spectator = SpectatorServer(args.spectator_port)
+        except OSError as e:
+            events.emit("error", message=f"Could not start the spectator stream on port {args.spectator_port} ({e}).")
+    try:
+        HeadlessGame(cap, events, spectator).run()
+    except RuntimeError as e:
+        events.emit("error", message=str(e))
+        cap.release()
+        if spectator:
+            spectator.stop()
+    finally:
+        events.close()
+
+def start_game(startup=None):
     root = tk.Tk()
-    app = WhiffleGame(root)
+    app = WhiffleGame(root, startup)
     root.mainloop()
 
 if __name__ == "__main__":
-    splash_root = tk.Tk()
-    SplashScreen(splash_root, start_game)
-    splash_root.mainloop()
\ No newline at end of file
+    if "--headless" in sys.argv:
+        run_headless(sys.argv[1:])
+    else:
+        load_gui_modules()
+        splash_root = tk.Tk()
+        splash = SplashScreen(splash_root, start_game)
+        splash_root.update()  # Draw the splash before the startup threads begin
+        splash.start(StartupLoader())
+        splash_root.mainloop()
\ No newline at end of file
@@ -48,6 +48,16 @@ RED_MIN_CIRCULARITY = 0.85
 RED_BALL_LIMIT = 1
 RED_BALL_COOLDOWN = 2.0
 
+# Tracker settings ("kalman" predicts each ball with a constant-velocity filter so detection can run slower, "centroid" matches nearest positions)
+TRACKER_MODE = "kalman"
+KALMAN_PROCESS_NOISE = 1e6  # Acceleration variance, (px/s^2)^2
+KALMAN_MEASUREMENT_NOISE = 4.0  # Detection position variance, px^2
+KALMAN_INITIAL_VELOCITY_VARIANCE = 4e5  # (px/s)^2, a new ball can already be moving fast in any direction
+KALMAN_GATE = 9.21  # Chi-squared bound on the innovation, 99% for 2 degrees of freedom
+KALMAN_MIN_GATE_DISTANCE = 15  # Pixels, detections this close to the prediction are always allowed
+KALMAN_MAX_DT = 0.5  # Seconds, longer gaps (pauses) are clamped
+DETECTION_FPS = 8 if TRACKER_MODE == "kalman" else 15  # Detection thread rate
+
 # Particle effect settings (reduced for Pi)
 PARTICLE_COUNT = 10
 PARTICLE_LIFETIME = 300
@@ -259,6 +269,117 @@ class CentroidTracker:
 
         return self.objects
 
+class KalmanTracker:
+    # Same interface as CentroidTracker, but every object carries a constant-velocity Kalman filter (x, y, vx, vy).
+    # Detections are matched against the predicted positions, gated on the innovation, so fast balls keep their
+    # IDs at low detection rates. All tracks are predicted and corrected together as arrays
+    def __init__(self, max_disappeared=5):
+        self.next_object_id = 0
+        self.objects = OrderedDict()
+        self.disappeared = OrderedDict()
+        self.max_disappeared = max_disappeared
+        self.ids = []
+        self.state = np.zeros((0, 4))
+        self.covariance = np.zeros((0, 4, 4))
+        self.last_update = None
+
+    def start_track(self, object_id, centroid):
+        self.objects[object_id] = centroid
+        self.disappeared[object_id] = 0
+        self.ids.append(object_id)
+        self.state = np.vstack([self.state, [centroid[0], centroid[1], 0.0, 0.0]])
+        covariance = np.diag([KALMAN_MEASUREMENT_NOISE, KALMAN_MEASUREMENT_NOISE,
+                              KALMAN_INITIAL_VELOCITY_VARIANCE, KALMAN_INITIAL_VELOCITY_VARIANCE])
+        self.covariance = np.concatenate([self.covariance, covariance[None]])
+
+    def register(self, centroid):
+        self.start_track(self.next_object_id, centroid)
+        self.next_object_id += 1
+
+    def deregister(self, object_id):
+        del self.objects[object_id]
+        del self.disappeared[object_id]
+        row = self.ids.index(object_id)
+        del self.ids[row]
+        self.state = np.delete(self.state, row, axis=0)
+        self.covariance = np.delete(self.covariance, row, axis=0)
+
+    def predict(self, dt):
+        transition = np.eye(4)
+        transition[0, 2] = transition[1, 3] = dt
+        # White-noise acceleration model, applied to x and y independently
+        noise = np.zeros((4, 4))
+        noise[[0, 1], [0, 1]] = dt ** 4 / 4
+        noise[[0, 1], [2, 3]] = noise[[2, 3], [0, 1]] = dt ** 3 / 2
+        noise[[2, 3], [2, 3]] = dt ** 2
+        self.state = self.state @ transition.T
+        self.covariance = transition @ self.covariance @ transition.T + noise * KALMAN_PROCESS_NOISE
+
+    def associate(self, detections):
+        # Greedy matching on Mahalanobis distance; a pair is allowed inside the chi-squared gate or the pixel floor
+        innovation_covariance = self.covariance[:, :2, :2] + np.eye(2) * KALMAN_MEASUREMENT_NOISE
+        difference = detections[None, :, :] - self.state[:, None, :2]
+        mahalanobis = np.einsum("nmi,nij,nmj->nm", difference, np.linalg.inv(innovation_covariance), difference)
+        allowed = (mahalanobis <= KALMAN_GATE) | (np.linalg.norm(difference, axis=2) <= KALMAN_MIN_GATE_DISTANCE)
+        rows, cols = np.nonzero(allowed)
+        order = np.argsort(mahalanobis[rows, cols])
+        used_rows, used_cols = set(), set()
+        matches = []
+        for row, col in zip(rows[order], cols[order]):
+            if row in used_rows or col in used_cols:
+                continue
+            used_rows.add(row)
+            used_cols.add(col)
+            matches.append((row, col))
+        return matches
+
+    def correct(self, rows, detections):
+        covariance = self.covariance[rows]
+        innovation_covariance = covariance[:, :2, :2] + np.eye(2) * KALMAN_MEASUREMENT_NOISE
+        gain = covariance[:, :, :2] @ np.linalg.inv(innovation_covariance)
+        innovation = detections - self.state[rows, :2]
+        self.state[rows] += (gain @ innovation[:, :, None])[:, :, 0]
+        self.covariance[rows] = covariance - gain @ covariance[:, :2, :]
+
+    def update(self, centroids, now=None):
+        now = time.monotonic() if now is None else now
+        dt = 0.0 if self.last_update is None else min(now - self.last_update, KALMAN_MAX_DT)
+        self.last_update = now
+        if self.ids:
+            self.predict(dt)
+
+        detections = np.array(centroids, dtype=np.float64).reshape(-1, 2)
+        matches = self.associate(detections) if self.ids and len(detections) else []
+        matched_rows = np.array([row for row, _ in matches], dtype=np.intp)
+        matched_cols = np.array([col for _, col in matches], dtype=np.intp)
+        if len(matches):
+            self.correct(matched_rows, detections[matched_cols])
+
+        # Matched objects report the detection itself so callers can pair it with the ball; the rest coast on the prediction
+        matched = dict(zip(matched_rows.tolist(), matched_cols.tolist()))
+        for row, object_id in enumerate(list(self.ids)):
+            if row in matched:
+                self.objects[object_id] = centroids[matched[row]]
+                self.disappeared[object_id] = 0
+            else:
+                self.objects[object_id] = (float(self.state[row, 0]), float(self.state[row, 1]))
+                self.disappeared[object_id] += 1
+        for object_id in [object_id for object_id in self.ids if self.disappeared[object_id] > self.max_disappeared]:
+            self.deregister(object_id)
+
+        used_cols = set(matched_cols.tolist())
+        for col in range(len(centroids)):
+            if col not in used_cols:
+                self.register(centroids[col])
+
+        return self.objects
+
+
+def create_tracker():
+    if TRACKER_MODE == "kalman":
+        return KalmanTracker(max_disappeared=5)
+    return CentroidTracker(max_disappeared=5)
+
 def detect_and_track_balls(frame, tracker):
     hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
     blurred = cv2.GaussianBlur(hsv, (3, 3), 0)  # Smaller kernel for Pi
@@ -305,6 +426,8 @@ def detect_and_track_balls(frame, tracker):
     tracked_objects = tracker.update(centroids)
     tracked_balls = []
     for obj_id, (x, y) in tracked_objects.items():
+        if tracker.disappeared[obj_id]:
+            continue  # Objects that were not matched this frame keep an old or predicted position
         for ball_x, ball_y, radius, color in balls:
             if abs(ball_x - x) < 10 and abs(ball_y - y) < 10:
                 tracked_balls.append((ball_x, ball_y, radius, obj_id, color))
@@ -788,7 +911,7 @@ class WhiffleGame:
         self.special_hole_text = None
         self.power_up_zone_circle = None
         self.power_up_zone_text = None
-        self.tracker = CentroidTracker(max_disappeared=5)
+        self.tracker = create_tracker()
         self.previous_balls = []
         self.tracked_balls = []
         self.last_red_score_time = 0.0
@@ -820,7 +943,7 @@ class WhiffleGame:
                 if ret:
                     tracked_balls = detect_and_track_balls(frame, self.tracker)
                     self.tracked_balls_queue.put(tracked_balls)
-                time.sleep(0.067)  # Limit to 15 FPS for detection thread
+                time.sleep(1.0 / DETECTION_FPS)  # Limit the detection thread rate
             else:
                 time.sleep(0.1)
 
@@ -906,7 +1029,7 @@ class WhiffleGame:
         current_score = 0
         scored_ball_ids.clear()
         RED_BALL_LIMIT = 1
-        self.tracker = CentroidTracker(max_disappeared=5)
+        self.tracker = create_tracker()
         self.previous_balls = []
         self.new_high_score_prompted = False
         self.power_up_zone = None
@@ -1247,7 +1370,7 @@ class WhiffleGame:
             self.zone_count = 0
             global scored_ball_ids
             scored_ball_ids.clear()
-            self.tracker = CentroidTracker(max_disappeared=5)
+            self.tracker = create_tracker()
             self.power_up_zone = None
             self.power_up = None
             self.last_power_up_spawn = 0
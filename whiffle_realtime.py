@@ -180,40 +180,66 @@ def preprocess_frame(frame):
         logging.error(f"Error preprocessing frame: {e}")
         return None, frame
 
-def detect_balls(frame, blurred):
+def detection_bounds(holes, frame_shape):
+    """Restrict HoughCircles to the calibrated playfield and ball radii that fit the holes."""
+    height, width = frame_shape[:2]
+    min_radius = max(5, int(np.ceil(height * 0.003)))
+    max_radius = int(height * 0.015)
+    if not holes:
+        return (0, 0, width, height), (min_radius, max_radius)
+    hole_radius = max(h["radius"] for h in holes)
+    max_radius = max(min_radius, min(max_radius, int(hole_radius * 1.5)))
+    margin = int(hole_radius * 1.5) + max_radius
+    x_min = max(min(h["x"] for h in holes) - margin, 0)
+    y_min = max(min(h["y"] for h in holes) - margin, 0)
+    x_max = min(max(h["x"] for h in holes) + margin, width)
+    y_max = min(max(h["y"] for h in holes) + margin, height)
+    logging.info(f"Detection ROI: ({x_min}, {y_min})-({x_max}, {y_max}), radius {min_radius}-{max_radius}")
+    return (x_min, y_min, x_max, y_max), (min_radius, max_radius)
+
+def detect_balls(frame, blurred, roi=None, radius_bounds=(5, 30)):
     """Detect red and white balls using HoughCircles."""
     try:
-        circles = cv2.HoughCircles(blurred, cv2.HOUGH_GRADIENT, dp=1.2, minDist=30,
-                                   param1=50, param2=20, minRadius=5, maxRadius=30)
+        height, width = frame.shape[:2]
+        x_off, y_off, x_end, y_end = roi if roi else (0, 0, width, height)
+        min_radius, max_radius = radius_bounds
+        circles = cv2.HoughCircles(blurred[y_off:y_end, x_off:x_end], cv2.HOUGH_GRADIENT, dp=1.2, minDist=30,
+                                   param1=50, param2=20, minRadius=min_radius, maxRadius=max_radius)
         balls = []
+        log_lines = []
         if circles is not None:
             circles = np.round(circles[0, :]).astype("int")
-            height, width = frame.shape[:2]
-            with open("detection_log.txt", "a") as f:
-                f.write(f"--- Captured Frame ---\nTotal circles detected: {len(circles)}\n")
-            for (x, y, r) in circles:
-                if r < height * 0.003 or r > height * 0.015:
-                    with open("detection_log.txt", "a") as f:
-                        f.write(f"Filtered by radius: {r} (expected {height * 0.003}-{height * 0.015})\n")
-                    continue
-                y_min, y_max = max(y - r, 0), min(y + r, height)
-                x_min, x_max = max(x - r, 0), min(x + r, width)
-                if y_max <= y_min or x_max <= x_min:
-                    continue
-                roi = frame[y_min:y_max, x_min:x_max]
-                hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-                avg_color = np.mean(hsv_roi, axis=(0, 1))[:3]
-                is_red = (0 <= avg_color[0] <= 10 or 160 <= avg_color[0] <= 180) and avg_color[1] > 40 and avg_color[2] > 80
-                is_white = avg_color[1] < 50 and avg_color[2] > 150
-                with open("detection_log.txt", "a") as f:
-                    f.write(f"Circle at ({x}, {y}), radius {r}, HSV: {avg_color}, is_red: {is_red}, is_white: {is_white}\n")
-                if is_red or is_white:
-                    balls.append({"x": x, "y": y, "radius": r, "is_red": is_red})
-                    with open("detection_log.txt", "a") as f:
-                        f.write(f"Confirmed ball: {'red' if is_red else 'white'} at ({x}, {y})\n")
+            circles[:, 0] += x_off
+            circles[:, 1] += y_off
+            log_lines.append(f"--- Captured Frame ---\nTotal circles detected: {len(circles)}")
+            in_range = (circles[:, 2] >= height * 0.003) & (circles[:, 2] <= height * 0.015)
+            for x, y, r in circles[~in_range]:
+                log_lines.append(f"Filtered by radius: {r} (expected {height * 0.003}-{height * 0.015})")
+            circles = circles[in_range]
+
+            # Mean HSV over every circle's bounding square from one integral image of the ROI
+            hsv = cv2.cvtColor(frame[y_off:y_end, x_off:x_end], cv2.COLOR_BGR2HSV)
+            sums = cv2.integral(hsv).astype(np.float64)
+            x, y, r = circles[:, 0] - x_off, circles[:, 1] - y_off, circles[:, 2]
+            x_min, x_max = np.clip(x - r, 0, x_end - x_off), np.clip(x + r, 0, x_end - x_off)
+            y_min, y_max = np.clip(y - r, 0, y_end - y_off), np.clip(y + r, 0, y_end - y_off)
+            valid = (x_max > x_min) & (y_max > y_min)
+            circles, x_min, x_max, y_min, y_max = circles[valid], x_min[valid], x_max[valid], y_min[valid], y_max[valid]
+            totals = sums[y_max, x_max] - sums[y_min, x_max] - sums[y_max, x_min] + sums[y_min, x_min]
+            avg_colors = totals / ((x_max - x_min) * (y_max - y_min))[:, None]
+            hue, sat, val = avg_colors[:, 0], avg_colors[:, 1], avg_colors[:, 2]
+            is_red = (((hue >= 0) & (hue <= 10)) | ((hue >= 160) & (hue <= 180))) & (sat > 40) & (val > 80)
+            is_white = (sat < 50) & (val > 150)
+
+            for (x, y, r), avg_color, red, white in zip(circles, avg_colors, is_red, is_white):
+                log_lines.append(f"Circle at ({x}, {y}), radius {r}, HSV: {avg_color}, is_red: {red}, is_white: {white}")
+                if red or white:
+                    balls.append({"x": int(x), "y": int(y), "radius": int(r), "is_red": bool(red)})
+                    log_lines.append(f"Confirmed ball: {'red' if red else 'white'} at ({x}, {y})")
         else:
-            with open("detection_log.txt", "a") as f:
-                f.write("No circles detected by HoughCircles\n")
+            log_lines.append("No circles detected by HoughCircles")
+        with open("detection_log.txt", "a") as f:
+            f.write("\n".join(log_lines) + "\n")
         logging.info(f"Detected {len(balls)} balls.")
         return balls
     except Exception as e:
@@ -295,6 +321,9 @@ if not running:
     print("Program terminated.")
     exit()
 
+# Limit detection to the calibrated playfield
+detection_roi, radius_bounds = detection_bounds(scoring_holes, (height, width))
+
 # Initialize game state
 high_score_data = load_high_score()
 # Ensure high_score_data is a dictionary
@@ -337,7 +366,7 @@ while running:
             logging.warning("Frame preprocessing failed. Skipping frame.")
             continue
 
-        balls = detect_balls(display_frame, blurred)
+        balls = detect_balls(display_frame, blurred, detection_roi, radius_bounds)
         draw_elements(display_frame, balls, scoring_holes, final_score, special_hole_hit)
         
         cv2.imshow("Whiffle 1931 Playfield", display_frame)